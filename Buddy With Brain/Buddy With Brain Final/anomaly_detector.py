@@ -0,0 +1,85 @@
+import pandas as pd
+
+# --- Unusual spending detection ---
+# Same rule as the notebook (Q3 + 1.5 * IQR), but per category and over a
+# trailing window of earlier days, so a day is judged against recent history.
+# Daily totals are kept incrementally and only days from the earliest new
+# transaction onwards are re-scored.
+
+WINDOW = '90D'
+MIN_HISTORY_DAYS = 8
+IQR_FACTOR = 1.5
+
+STATS_COLUMNS = ['date', 'category', 'amount', 'median', 'upper', 'is_anomaly']
+
+
+def build_daily_totals(df):
+    """Expense totals indexed by (date, category)."""
+    expenses = df[df['Income/Expense'] == 'Expense']
+    if expenses.empty:
+        return pd.Series(dtype=float, index=pd.MultiIndex.from_arrays(
+            [pd.DatetimeIndex([]), []], names=['date', 'category']))
+    days = pd.to_datetime(expenses['date']).dt.normalize()
+    totals = pd.to_numeric(expenses['amount']).groupby([days.rename('date'), expenses['category']]).sum()
+    return totals.rename_axis(['date', 'category'])
+
+
+def update_daily_totals(totals, new_rows):
+    delta = build_daily_totals(new_rows)
+    if delta.empty:
+        return totals
+    if totals.empty:
+        return delta
+    return totals.add(delta, fill_value=0).sort_index()
+
+
+def score_days(daily_totals, since=None):
+    """
+    Rolling median and IQR threshold for every (day, category) with spending.
+    All categories are scored together as columns of one day x category frame.
+    If `since` is given, only days from `since` onwards are returned.
+    """
+    if daily_totals.empty:
+        return pd.DataFrame(columns=STATS_COLUMNS)
+
+    wide = daily_totals.unstack('category').sort_index()
+    if since is not None:
+        since = pd.Timestamp(since).normalize()
+        wide = wide[wide.index >= since - pd.Timedelta(WINDOW)]
+
+    # closed='left' keeps the day being judged out of its own baseline
+    rolling = wide.rolling(WINDOW, min_periods=MIN_HISTORY_DAYS, closed='left')
+    q1 = rolling.quantile(0.25)
+    q3 = rolling.quantile(0.75)
+    median = rolling.median()
+    upper = q3 + IQR_FACTOR * (q3 - q1)
+
+    stats = pd.DataFrame({
+        'amount': wide.stack(),
+        'median': median.stack(),
+        'upper': upper.stack(),
+    }).reset_index().dropna(subset=['amount'])
+    if since is not None:
+        stats = stats[stats['date'] >= since]
+    stats = stats.assign(is_anomaly=stats['amount'] > stats['upper'])
+    return stats[STATS_COLUMNS].reset_index(drop=True)
+
+
+def update_scores(stats, daily_totals, since):
+    """Re-scores only the days a new batch can affect and splices them in."""
+    since = pd.Timestamp(since).normalize()
+    fresh = score_days(daily_totals, since=since)
+    kept = stats[stats['date'] < since] if not stats.empty else stats
+    if kept.empty:
+        return fresh
+    return pd.concat([kept, fresh], ignore_index=True)
+
+
+def anomalous_transactions(df, stats):
+    """Transactions that fall on an anomalous day for their category, largest first."""
+    flagged = stats.loc[stats['is_anomaly'], ['date', 'category', 'median', 'upper']]
+    if flagged.empty or df.empty:
+        return df.iloc[0:0].assign(day_median=pd.Series(dtype=float))
+    txns = df[df['Income/Expense'] == 'Expense'].assign(day=lambda d: pd.to_datetime(d['date']).dt.normalize())
+    merged = txns.merge(flagged.rename(columns={'date': 'day', 'median': 'day_median'}), on=['day', 'category'])
+    return merged.drop(columns=['day', 'upper']).sort_values('amount', ascending=False)
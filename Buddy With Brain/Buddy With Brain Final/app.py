@@ -6,13 +6,33 @@ import yaml
 from yaml.loader import SafeLoader
 import datetime
 import plotly.express as px
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import nltk
 from pathlib import Path
 import json 
+import os
 import glob 
-from prophet import Prophet 
 from prophet.plot import plot_plotly 
-from categorynltk import categorize_expense, ALL_CATEGORIES
+from prophet.serialize import model_from_json
+from categorynltk import ALL_CATEGORIES
+from learned_categorizer import categorize_batch, load_model, save_model
+from goal_tracker import build_month_totals, update_month_totals, goal_progress, new_breaches
+from anomaly_detector import build_daily_totals, update_daily_totals, score_days, update_scores, anomalous_transactions
+from recurring_detector import build_events, summarize, update_recurring, monthly_cost
+from exporter import EXPORT_FORMATS, EXPORT_TTL_SECONDS, export_file_name, publish_export, remove_export
+from upload_jobs import UploadJobQueue
+from bank_profiles import load_profiles, save_profile
+from user_store import UserStore, attach_user_store
+from benchmarks import MIN_USERS, build_user_sketch, save_sketch, merge_sketches, complete_months, compare
+from history_loader import RECENT_MONTHS, recent_start, HistoryBackfill
+from data_versions import read_versions, bump_version, ledger_lock, ledger_reload_start
+from forecast_scheduler import load_precomputed, staleness
+from goal_simulator import N_PATHS, daily_history, days_left_in_month, bootstrap_paths, forecast_paths, simulate_goals
+from backtesting import ENGINES, forecast_with, backtest_series, backtest_frame, best_engines, monthly_error, save_backtests, load_backtests
+from forecast_pool import ForecastPool, fit_job, wait_for
+from currency import BASE_CURRENCY, load_rates, merge_rates, available_currencies, to_inr
+from forecasting import TOTAL, DAYS_PER_MONTH, MIN_HISTORY_DAYS, daily_series, projected_monthly_spend, fit_node, hierarchy_series, reconcile_fits
 
 try:
     nltk.data.find('tokenizers/punkt')
@@ -31,31 +51,99 @@ st.set_page_config(page_title="Buddy With Brain", page_icon="🧠", layout="wide
 
 DATA_DIR = Path("user_data")
 DATA_DIR.mkdir(exist_ok=True)
+# Served at app/static/ (server.enableStaticServing); exports are downloaded from here
+STATIC_DIR = Path(__file__).resolve().parent / "static"
 
 def get_user_data_file(username):
     return DATA_DIR / f"data_{username}.parquet"
 
-def load_data(username):
+# Ledgers are saved sorted by date in row groups of this many rows. Parquet keeps
+# min/max statistics per group, so a date filter skips every group outside it.
+ROW_GROUP_ROWS = 8_192
+# How often an open page checks for rows saved by another worker or the ingestion service
+CHANGE_POLL_SECONDS = 10
+
+def date_filters(start=None, end=None):
+    """
+    Parquet predicate for dates from `start` to `end` (whole calendar days).
+    Rows without a date (older ledgers coerced bad dates to NaT) sort last in
+    the file, so a range with no `end` includes them; a date filter alone
+    would drop them, and the next save would write the ledger without them.
+    """
+    date = ds.field('date')
+    predicate = None
+    if start is not None:
+        predicate = date >= pd.Timestamp(start)
+    if end is not None:
+        before_end = date < pd.Timestamp(end) + pd.Timedelta(days=1)
+        predicate = before_end if predicate is None else predicate & before_end
+    elif predicate is not None:
+        predicate = predicate | date.is_null()
+    return predicate
+
+def load_data(username, start=None, end=None, columns=None):
+    """
+    Reads the user's ledger. The date range and `columns` are pushed down to
+    pyarrow, so row groups outside the dates and unused columns are never read.
+    """
     data_file = get_user_data_file(username)
     if data_file.exists():
         try:
-            df = pd.read_parquet(data_file)
+            if columns is not None:
+                available = set(pq.read_schema(data_file).names)
+                columns = [c for c in columns if c in available]
+            df = pd.read_parquet(data_file, columns=columns, filters=date_filters(start, end))
         except Exception as e:
             st.error(f"Error loading data: {e}. Creating new empty dataframe.")
             df = pd.DataFrame(columns=['date', 'description', 'amount', 'Income/Expense', 'category'])
     else:
         df = pd.DataFrame(columns=['date', 'description', 'amount', 'Income/Expense', 'category'])
     
-    df['date'] = pd.to_datetime(df['date'])
+    if 'date' in df.columns:
+        df['date'] = pd.to_datetime(df['date'])
+    # Ledgers from before multi-currency support are all in rupees
+    if columns is None and 'currency' not in df.columns:
+        df['currency'] = BASE_CURRENCY
+    if columns is None and 'original_amount' not in df.columns:
+        df['original_amount'] = df['amount']
     return df
 
-def save_data(username, df):
+def record_save(username, kind, changed_from=None):
+    """
+    Bumps the user's version so sessions on other workers reload. Ledger saves
+    sync under the ledger lock first, so this session is up to date for them;
+    for goals and the model, unless another worker saved in between.
+    """
+    versions = bump_version(DATA_DIR, username, kind, changed_from)
+    seen = st.session_state.get("seen_versions")
+    if seen is not None and versions[kind] == seen[kind] + 1:
+        seen[kind] = versions[kind]
+
+def save_data(username, df, changed_from=None):
+    """
+    Saves the ledger; `changed_from` is the earliest date whose rows changed, if
+    known. Callers hold the ledger lock and have synced first (see update_ledger).
+    """
     data_file = get_user_data_file(username)
+    tmp_file = data_file.with_suffix(".tmp")
     try:
-        df.to_parquet(data_file, index=False)
+        df.sort_values('date', kind='mergesort').to_parquet(tmp_file, index=False, row_group_size=ROW_GROUP_ROWS)
+        # Other workers may be reading the file; they see either the old one or the new one
+        os.replace(tmp_file, data_file)
+        record_save(username, 'ledger', changed_from)
     except Exception as e:
         st.error(f"Error saving data: {e}")
 
+# A category edit finds its rows by these columns, since a save can first pull
+# in rows from other workers and move the rows around in the session's frame
+EDIT_KEY = ['date', 'description', 'amount', 'Income/Expense']
+
+def apply_category_edits(df, edits):
+    """Sets the category of every row that matches an edit (EDIT_KEY columns plus the new category)."""
+    edits = edits.drop_duplicates(EDIT_KEY, keep='last')
+    new_category = df[EDIT_KEY].merge(edits, on=EDIT_KEY, how='left')['category']
+    return df.assign(category=new_category.fillna(df['category'].reset_index(drop=True)).to_numpy())
+
 def get_user_goals_file(username):
     """Returns the Path object for a user's JSON goals file."""
     return DATA_DIR / f"goals_{username}.json"
@@ -78,14 +166,86 @@ def save_goals(username, goals):
     try:
         with open(goals_file, 'w') as f:
             json.dump(goals, f, indent=4)
+        record_save(username, 'goals')
     except Exception as e:
         st.error(f"Error saving goals: {e}")
 
+def get_bank_profiles_file():
+    """Returns the Path object for the saved bank statement formats."""
+    return DATA_DIR / "bank_profiles.json"
+
+def get_user_sketch_file(username):
+    """Returns the Path object for a user's monthly-spend sketch used in benchmarks."""
+    return DATA_DIR / f"sketch_{username}.json"
+
+def save_user_sketch(username, month_totals):
+    try:
+        save_sketch(get_user_sketch_file(username), build_user_sketch(month_totals))
+    except Exception as e:
+        st.error(f"Error saving benchmark sketch: {e}")
+
+@st.cache_data(ttl=600)
+def load_benchmarks():
+    """Merges every user's sketch; the ledgers themselves are never read."""
+    return merge_sketches(sorted(DATA_DIR.glob("sketch_*.json")))
+
+def get_rates_file():
+    """Returns the Path object for the local table of historical exchange rates."""
+    return DATA_DIR / "exchange_rates.csv"
+
+@st.cache_data
+def load_exchange_rates(path, mtime):
+    """Re-read only when the rate table changes."""
+    return load_rates(Path(path))
+
+def current_rates():
+    rates_file = get_rates_file()
+    return load_exchange_rates(str(rates_file), rates_file.stat().st_mtime if rates_file.exists() else 0)
+
+def get_user_model_file(username):
+    """Returns the Path object for a user's learned category model."""
+    return DATA_DIR / f"model_{username}.npz"
+
+def save_category_model(username, model):
+    """Saves the model trained from a user's category corrections."""
+    try:
+        save_model(get_user_model_file(username), model)
+        record_save(username, 'model')
+    except Exception as e:
+        st.error(f"Error saving category model: {e}")
+
+
+@st.cache_resource
+def get_upload_queue():
+    """One upload worker pool per server process, shared by all sessions."""
+    return UploadJobQueue()
+
+
+CONFIG_FILE = Path('config.yaml')
+ADMIN_PAGE_SIZE = 50
+
+@st.cache_resource(on_release=lambda pool: pool.shutdown())
+def get_forecast_pool():
+    """One forecast process pool per server process, shared by all sessions; stopped when the cache is cleared."""
+    return ForecastPool()
+
+@st.cache_data
+def load_config(path, mtime):
+    """Parses config.yaml; re-read only when the file changes."""
+    with open(path) as file:
+        return yaml.load(file, Loader=SafeLoader)
+
+@st.cache_resource
+def get_user_store():
+    """The SQLite user registry, seeded once from the users in config.yaml."""
+    store = UserStore(DATA_DIR / "users.db")
+    store.migrate_from_yaml(CONFIG_FILE)
+    return store
+
 
 # --- 2. LOAD AUTHENTICATION CONFIG ---
 try:
-    with open('config.yaml') as file:
-        config = yaml.load(file, Loader=SafeLoader)
+    config = load_config(str(CONFIG_FILE), CONFIG_FILE.stat().st_mtime)
 except FileNotFoundError:
     st.error("Error: 'config.yaml' file not found. Please make sure it's in the same directory.")
     st.stop()
@@ -93,12 +253,16 @@ except Exception as e:
     st.error(f"Error loading config.yaml: {e}")
     st.stop()
 
+user_store = get_user_store()
+
+# Users live in the store; config.yaml only provides the cookie settings now
 authenticator = stauth.Authenticate(
-    config['credentials'],
+    {'usernames': {}},
     config['cookie']['name'],
     config['cookie']['key'],
     config['cookie']['expiry_days']
 )
+attach_user_store(authenticator, user_store)
 
 # --- 3. CHECK LOGIN STATUS ---
 if "authentication_status" not in st.session_state:
@@ -129,39 +293,247 @@ if st.session_state["authentication_status"]:
             val_str += f"₹{amount:,.2f}"
         return val_str
 
+    def queue_goal_alerts(before):
+        """Queues a warning for each goal that is over budget now but was not in `before` (goal_progress's frame)."""
+        after = goal_progress(st.session_state.month_totals, st.session_state.goals)
+        alerts = st.session_state.setdefault("goal_alerts", [])
+        for _, row in new_breaches(before, after).iterrows():
+            alerts.append(
+                f"⚠️ You are now over your {row['category']} goal for this month: "
+                f"{format_indian_currency(row['spent'])} spent of {format_indian_currency(row['goal'])}."
+            )
+
+    def record_new_transactions(new_rows):
+        """Adds inserted rows to the goal totals and queues a warning for each goal they push over budget."""
+        before = goal_progress(st.session_state.month_totals, st.session_state.goals)
+        st.session_state.month_totals = update_month_totals(st.session_state.month_totals, new_rows)
+        queue_goal_alerts(before)
+
+        # Re-score unusual spending only from the earliest new day onwards
+        st.session_state.daily_totals = update_daily_totals(st.session_state.daily_totals, new_rows)
+        new_dates = pd.to_datetime(new_rows['date']).dropna()
+        if not new_dates.empty:
+            st.session_state.anomaly_stats = update_scores(
+                st.session_state.anomaly_stats, st.session_state.daily_totals, new_dates.min()
+            )
+
+        st.session_state.recurring_events, st.session_state.recurring = update_recurring(
+            st.session_state.recurring_events, st.session_state.recurring, new_rows
+        )
+        save_user_sketch(username, st.session_state.month_totals)
+        st.session_state.data_version += 1
+
+    def refresh_ledger_stats():
+        """Rebuilds all running totals after rows were edited in place."""
+        st.session_state.month_totals = build_month_totals(st.session_state.df)
+        st.session_state.daily_totals = build_daily_totals(st.session_state.df)
+        st.session_state.anomaly_stats = score_days(st.session_state.daily_totals)
+        save_user_sketch(username, st.session_state.month_totals)
+        st.session_state.data_version += 1
+
+    def show_notices():
+        """Messages queued by a panel before it reran the whole page."""
+        for notice in st.session_state.pop("notices", []):
+            st.success(notice)
+        for alert in st.session_state.pop("goal_alerts", []):
+            st.warning(alert)
+
+    def derived(name, build):
+        """A frame computed from the ledger, rebuilt only after the ledger changes."""
+        cache = st.session_state.setdefault("derived_frames", {})
+        version = st.session_state.data_version
+        if name not in cache or cache[name][0] != version:
+            cache[name] = (version, build(st.session_state.df))
+        return cache[name][1]
+
+    def build_analysis_frame(df):
+        df_analysis = df.copy()
+        df_analysis['date'] = pd.to_datetime(df_analysis['date'])
+        df_analysis['amount'] = pd.to_numeric(df_analysis['amount'])
+        df_analysis['year'] = df_analysis['date'].dt.year
+        df_analysis['month_year'] = df_analysis['date'].dt.strftime('%B %Y')
+        return df_analysis
+
+    # --- Progressive history ---
+    # Only the last few months are read at login; the rest is read in a thread
+    # (st.session_state.backfill) and merged in on the first run after it ends.
+
+    def history_complete():
+        return "backfill" not in st.session_state
+
+    def merge_history():
+        """
+        Puts the backfilled older rows in front of the recent ones and rebuilds
+        the running totals. Returns how many rows were added.
+        """
+        older = st.session_state.backfill.result
+        df = pd.concat([older, st.session_state.df], ignore_index=True)
+        df['currency'] = df['currency'].fillna(BASE_CURRENCY)
+        df['original_amount'] = df['original_amount'].fillna(df['amount'])
+        st.session_state.df = df
+        del st.session_state.backfill
+        refresh_ledger_stats()
+        st.session_state.recurring_events = build_events(df)
+        st.session_state.recurring = summarize(st.session_state.recurring_events)
+        return len(older)
+
+    def ensure_full_history():
+        """
+        Waits for the backfill and merges it; anything that saves the ledger
+        calls this first. Returns how many older rows were merged in.
+        """
+        backfill = st.session_state.get("backfill")
+        if backfill is None:
+            return 0
+        if not backfill.done:
+            with st.spinner("Loading full history..."):
+                backfill.wait()
+        if backfill.error:
+            st.error(f"Could not load your older transactions, so changes can't be saved: {backfill.error}")
+            st.stop()
+        return merge_history()
+
+    def show_history_status():
+        backfill = st.session_state.get("backfill")
+        if backfill is None or backfill.error:
+            return
+        if backfill.done:
+            st.rerun()
+        st.info(f"⏳ Showing your last {RECENT_MONTHS} months while the full history loads...")
+
+    def load_ledger(full=False):
+        """
+        Reads the recent rows and starts the backfill of older ones, if the
+        ledger has any; with `full`, reads everything at once.
+        """
+        data_file = get_user_data_file(username)
+        try:
+            split = recent_start(data_file) if data_file.exists() and not full else None
+        except Exception:
+            split = None
+        st.session_state.pop("backfill", None)
+        if split is None:
+            st.session_state.df = load_data(username)
+        else:
+            st.session_state.df = load_data(username, start=split)
+            st.session_state.backfill = HistoryBackfill(data_file, split)
+
+    # --- Other workers ---
+    # Sessions of the same user can live in other app processes; their saves
+    # show up as new versions in the user's version file (see data_versions.py).
+
+    def sync_with_other_workers(full_history=False):
+        """
+        Reloads whatever another worker saved since this session last looked.
+        With `full_history`, a full reload reads every row instead of
+        starting a new backfill.
+        """
+        current = read_versions(DATA_DIR, username)
+        seen = st.session_state.seen_versions
+        reload, start = ledger_reload_start(seen['ledger'], current)
+        if reload:
+            goals_before = goal_progress(st.session_state.month_totals, st.session_state.goals)
+            backfill = st.session_state.get("backfill")
+            if start is None or (backfill is not None and start < backfill.before):
+                load_ledger(full=full_history)
+            else:
+                # The file is sorted by date, so only the row groups from `start` on are read.
+                # `fresh` also holds the rows without a date, so the session's are dropped
+                # here rather than kept twice (or, if both sides filtered them, lost on save)
+                df = st.session_state.df
+                fresh = load_data(username, start=start)
+                st.session_state.df = pd.concat([df[df['date'] < start], fresh], ignore_index=True)
+                added = len(st.session_state.df) - len(df)
+                if added > 0:
+                    st.session_state.setdefault("notices", []).append(f"{added} new transaction(s) synced.")
+            st.session_state.month_totals = build_month_totals(st.session_state.df)
+            # Rows pushed by ingest_server.py can put a goal over budget too
+            queue_goal_alerts(goals_before)
+            st.session_state.daily_totals = build_daily_totals(st.session_state.df)
+            st.session_state.anomaly_stats = score_days(st.session_state.daily_totals)
+            st.session_state.recurring_events = build_events(st.session_state.df)
+            st.session_state.recurring = summarize(st.session_state.recurring_events)
+            st.session_state.data_version += 1
+        if current['goals'] != seen['goals']:
+            st.session_state.goals = load_goals(username)
+        if current['model'] != seen['model']:
+            st.session_state.category_model = load_model(get_user_model_file(username))
+        st.session_state.seen_versions = {kind: current[kind] for kind in ('ledger', 'goals', 'model')}
+
+    def update_ledger(change, changed_from=None):
+        """
+        Applies `change` (a function from the ledger frame to the new frame) and
+        saves the result. The ledger lock is held throughout, and rows saved
+        elsewhere are pulled in before the change, so the write keeps them.
+        """
+        ensure_full_history()
+        with ledger_lock(DATA_DIR, username):
+            sync_with_other_workers(full_history=True)
+            st.session_state.df = change(st.session_state.df)
+            save_data(username, st.session_state.df, changed_from)
+
+    def check_for_new_rows():
+        """Reruns the page when rows were saved elsewhere, e.g. by ingest_server.py."""
+        if read_versions(DATA_DIR, username)['ledger'] != st.session_state.seen_versions['ledger']:
+            st.rerun()
+
     if "df" not in st.session_state:
-        st.session_state.df = load_data(username)
+        # Read the versions first: a save landing during the load just means one extra reload
+        st.session_state.seen_versions = read_versions(DATA_DIR, username)
+        load_ledger()
+        st.session_state.data_version = 0
     
     if "goals" not in st.session_state:
         st.session_state.goals = load_goals(username)
+
+    if "category_model" not in st.session_state:
+        st.session_state.category_model = load_model(get_user_model_file(username))
+
+    if "month_totals" not in st.session_state:
+        st.session_state.month_totals = build_month_totals(st.session_state.df)
+        if history_complete() and not get_user_sketch_file(username).exists():
+            save_user_sketch(username, st.session_state.month_totals)
+
+    if "anomaly_stats" not in st.session_state:
+        st.session_state.daily_totals = build_daily_totals(st.session_state.df)
+        st.session_state.anomaly_stats = score_days(st.session_state.daily_totals)
+
+    if "recurring" not in st.session_state:
+        st.session_state.recurring_events = build_events(st.session_state.df)
+        st.session_state.recurring = summarize(st.session_state.recurring_events)
+
+    sync_with_other_workers()
     # ---
 
-    st.title("Buddy With Brain 🧠")
-    st.header("My Personal Expense Analyzer")
+    # --- Panels ---
+    # Each panel is a fragment, so using its widgets reruns only that panel.
+    # A panel that changes the ledger bumps data_version and reruns the whole
+    # page, since every other panel reads from the ledger.
 
-    # --- Create two columns for input ---
-    col1, col2 = st.columns(2)
+    upload_queue = get_upload_queue()
 
-    with col1:
+    @st.fragment
+    def upload_panel():
         st.subheader("Upload a File")
-        uploaded_file = st.file_uploader("Upload (CSV, Excel, PDF)", type=["csv", "xlsx", "pdf"], label_visibility="collapsed")
-        
-        if uploaded_file is not None:
+        rates = current_rates()
+        statement_currency = st.selectbox("Statement currency", available_currencies(rates),
+                                          help="Used for statements without a currency column")
+        uploaded_files = st.file_uploader("Upload (CSV, Excel, PDF)", type=["csv", "xlsx", "pdf"],
+                                          accept_multiple_files=True, label_visibility="collapsed")
+
+        # The uploader keeps its files across reruns, so only submit each one once
+        submitted_uploads = st.session_state.setdefault("submitted_uploads", set())
+        queued = False
+        for uploaded_file in uploaded_files or []:
+            if uploaded_file.file_id in submitted_uploads:
+                continue
             try:
-                df = None
-                if uploaded_file.name.endswith('xlsx'):
-                    df = pd.read_excel(uploaded_file)
-                elif uploaded_file.name.endswith('csv'):
-                    df = pd.read_csv(uploaded_file)
-
-                if df is not None:
-                    df['date'] = pd.to_datetime(df['date'], format='%d-%m-%Y %H:%M', errors='coerce')
-                    df['amount'] = pd.to_numeric(df['amount'])
-                    df['category'] = df.apply(lambda row: categorize_expense(row['description'], row['Income/Expense']), axis=1)
-                    st.session_state.df = pd.concat([st.session_state.df, df], ignore_index=True)
-                    save_data(username, st.session_state.df)
-                    st.success(f"File '{uploaded_file.name}' loaded and saved.")
-                    st.rerun()
+                if uploaded_file.name.endswith(('xlsx', 'csv')):
+                    upload_queue.submit(username, uploaded_file.name, uploaded_file.getvalue(),
+                                        load_profiles(get_bank_profiles_file()),
+                                        st.session_state.category_model, statement_currency, rates)
+                    submitted_uploads.add(uploaded_file.file_id)
+                    queued = True
 
                 elif uploaded_file.name.endswith('pdf'):
                     st.header("Extracted Text from PDF")
@@ -176,14 +548,65 @@ if st.session_state["authentication_status"]:
             
             except Exception as e:
                 st.error(f"Error: Could not read the file. Details: {e}")
+        if queued:
+            st.rerun()
 
-    with col2:
+        with st.expander("Bank formats"):
+            st.caption("Statements are matched to a format by their column names. "
+                       "Add one if your bank's layout isn't recognised.")
+            st.dataframe(
+                pd.DataFrame(load_profiles(get_bank_profiles_file())).drop(columns=['date_format'], errors='ignore'),
+                use_container_width=True, hide_index=True
+            )
+            with st.form("bank_profile_form", clear_on_submit=True):
+                bp_name = st.text_input("Bank / format name")
+                bp_date = st.text_input("Date column")
+                bp_desc = st.text_input("Description column")
+                bp_amount = st.text_input("Amount column", help="Leave empty if the statement has separate debit and credit columns")
+                bp_type = st.text_input("Type column (optional)", help="Column holding Dr/Cr or Income/Expense")
+                pcol1, pcol2 = st.columns(2)
+                bp_debit = pcol1.text_input("Debit column")
+                bp_credit = pcol2.text_input("Credit column")
+                bp_date_format = st.text_input("Date format (optional)", placeholder="e.g. %d/%m/%Y - inferred when empty")
+                bp_currency = st.text_input("Currency column (optional)", help="Column holding each row's currency code, e.g. USD")
+                bp_submitted = st.form_submit_button("Save Format")
+
+            if bp_submitted:
+                if not (bp_name and bp_date and bp_desc and (bp_amount or (bp_debit and bp_credit))):
+                    st.warning("Please give a name, date and description columns, and an amount or debit/credit columns.")
+                else:
+                    profile = {'name': bp_name, 'date': bp_date, 'description': bp_desc}
+                    for key, value in [('amount', bp_amount), ('type', bp_type), ('debit', bp_debit),
+                                       ('credit', bp_credit), ('date_format', bp_date_format), ('currency', bp_currency)]:
+                        if value:
+                            profile[key] = value
+                    try:
+                        save_profile(get_bank_profiles_file(), profile)
+                        st.success(f"Saved format '{bp_name}'.")
+                    except Exception as e:
+                        st.error(f"Error saving format: {e}")
+
+    # Poll the user's jobs without rerunning the rest of the page
+    def show_upload_status():
+        jobs = upload_queue.jobs_for(username)
+        for job in jobs:
+            if job.status == 'failed':
+                st.error(f"{job.file_name}: {job.error}")
+            else:
+                st.progress(job.progress, text=f"{job.file_name}: {job.message}")
+        if any(job.finished for job in jobs):
+            st.rerun()
+
+    @st.fragment
+    def manual_entry_panel():
         st.subheader("Add a New Transaction")
         with st.form("manual_entry_form", clear_on_submit=True):
             entry_date = st.date_input("Date", datetime.date.today())
             entry_desc = st.text_input("Description")
             entry_type = st.selectbox("Type", ["Expense", "Income"])
-            entry_amount = st.number_input("Amount (₹)", min_value=0.01, format="%.2f")
+            acol1, acol2 = st.columns([2, 1])
+            entry_amount = acol1.number_input("Amount", min_value=0.01, format="%.2f")
+            entry_currency = acol2.selectbox("Currency", available_currencies(current_rates()))
             
             submitted = st.form_submit_button("Add Transaction")
 
@@ -191,51 +614,55 @@ if st.session_state["authentication_status"]:
             if not entry_desc:
                 st.warning("Please enter a description.")
             else:
-                entry_category = categorize_expense(entry_desc, entry_type)
+                entry_category = categorize_batch([entry_desc], [entry_type], st.session_state.category_model)[0]
                 new_entry = pd.DataFrame([{
                     "date": pd.to_datetime(entry_date),
                     "description": entry_desc,
                     "amount": entry_amount,
                     "Income/Expense": entry_type,
-                    "category": entry_category
+                    "category": entry_category,
+                    "currency": entry_currency,
+                    "original_amount": entry_amount
                 }])
-                st.session_state.df = pd.concat([st.session_state.df, new_entry], ignore_index=True)
-                save_data(username, st.session_state.df)
-                st.success("Transaction added and saved!")
-
-    # --- 5. TABS FOR DASHBOARD AND FORECASTING ---
-    
-    #  Dynamic Tab Logic 
-    tabs_list = ["📊 Analysis Dashboard", "📈 Forecasting & Goals"]
-    if user_roles and 'admin' in user_roles:
-        tabs_list.append("🔒 Admin Dashboard")
-    
-    # Create tabs (unpack only what we need)
-    tabs = st.tabs(tabs_list)
-    # ---------------------------------------------
+                try:
+                    new_entry = to_inr(new_entry, current_rates())
+                except ValueError as e:
+                    st.error(str(e))
+                    return
+                update_ledger(lambda df: pd.concat([df, new_entry], ignore_index=True),
+                              changed_from=new_entry['date'].min())
+                record_new_transactions(new_entry)
+                st.session_state.setdefault("notices", []).append("Transaction added and saved!")
+                st.rerun()
 
-    # --- ANALYSIS DASHBOARD ---
-    with tabs[0]:
+    @st.fragment
+    def dashboard_panel():
         if not st.session_state.df.empty:
-            df_analysis = st.session_state.df.copy()
-
-            df_analysis['date'] = pd.to_datetime(df_analysis['date'])
-            df_analysis['amount'] = pd.to_numeric(df_analysis['amount'])
-            
-            df_analysis['year'] = df_analysis['date'].dt.year
-            df_analysis['month_year'] = df_analysis['date'].dt.strftime('%B %Y')
-            
             st.header("Filter Your Data")
-            filter_type = st.selectbox("Select Filter Type", ["Overall", "Yearly", "Monthly", "Date Range"])
+            filter_type = st.selectbox("Select Filter Type", ["Recent", "Overall", "Yearly", "Monthly", "Date Range"],
+                                       help=f"Recent is the last {RECENT_MONTHS} months of your transactions")
+            if filter_type != "Recent" and not history_complete():
+                # These views need every transaction; rerun the page once they are in
+                ensure_full_history()
+                st.rerun()
+            df_analysis = derived("analysis", build_analysis_frame)
             
             fcol1, fcol2 = st.columns(2)
             
-            df_filtered = df_analysis.copy()
+            df_filtered = df_analysis
+            export_start, export_end = None, None
+            export_ready = True
             
-            if filter_type == "Yearly":
+            if filter_type == "Recent":
+                recent_from = df_analysis['date'].max().normalize() - pd.DateOffset(months=RECENT_MONTHS)
+                df_filtered = df_analysis[df_analysis['date'] >= recent_from]
+                export_start, export_end = recent_from.date(), df_analysis['date'].max().date()
+
+            elif filter_type == "Yearly":
                 years = sorted(df_analysis['year'].unique(), reverse=True)
                 selected_year = fcol1.selectbox("Select Year", years)
                 df_filtered = df_analysis[df_analysis['year'] == selected_year]
+                export_start, export_end = datetime.date(selected_year, 1, 1), datetime.date(selected_year, 12, 31)
             
             elif filter_type == "Monthly":
                 month_options = df_analysis[['year', 'date']].copy()
@@ -246,6 +673,8 @@ if st.session_state["authentication_status"]:
                 
                 selected_month = fcol1.selectbox("Select Month", months)
                 df_filtered = df_analysis[df_analysis['month_year'] == selected_month]
+                month_start = pd.to_datetime(selected_month, format='%B %Y')
+                export_start, export_end = month_start.date(), (month_start + pd.offsets.MonthEnd(0)).date()
             
             elif filter_type == "Date Range":
                 start_date = fcol1.date_input("Start Date", df_analysis['date'].min())
@@ -253,11 +682,13 @@ if st.session_state["authentication_status"]:
                 
                 if start_date > end_date:
                     st.error("Error: Start date must be before end date.")
+                    export_ready = False
                 else:
                     df_filtered = df_analysis[
                         (df_analysis['date'].dt.date >= start_date) & 
                         (df_analysis['date'].dt.date <= end_date)
                     ]
+                    export_start, export_end = start_date, end_date
 
             if df_filtered.empty:
                 st.warning("No data found for the selected filter.")
@@ -319,11 +750,44 @@ if st.session_state["authentication_status"]:
                     fig_bar.update_traces(hovertemplate='<b>Category:</b> %{x}<br><b>Amount:</b> ₹%{y:,.2f}')
                     st.plotly_chart(fig_bar, use_container_width=True)
 
+                st.subheader("🚨 Unusual Spending")
+                if not history_complete():
+                    st.info("Unusual spending is scored once your full history has loaded.")
+                else:
+                    stats = st.session_state.anomaly_stats
+                    period_start = df_filtered['date'].min().normalize()
+                    period_end = df_filtered['date'].max().normalize()
+                    unusual_days = stats[
+                        stats['is_anomaly'] & (stats['date'] >= period_start) & (stats['date'] <= period_end)
+                    ]
+                    if unusual_days.empty:
+                        st.info("No unusual spending days in this period.")
+                    else:
+                        st.caption("Days where a category's spend was well above its usual level over the previous 90 days.")
+                        unusual_display = unusual_days.sort_values('date', ascending=False).copy()
+                        unusual_display['date'] = unusual_display['date'].dt.strftime('%Y-%m-%d')
+                        st.dataframe(
+                            unusual_display[['date', 'category', 'amount', 'median']],
+                            column_config={
+                                "date": "Date", "category": "Category",
+                                "amount": st.column_config.NumberColumn("Spent (₹)", format="%.2f"),
+                                "median": st.column_config.NumberColumn("Typical Day (₹)", format="%.2f"),
+                            },
+                            use_container_width=True, hide_index=True
+                        )
+                        with st.expander("Transactions on unusual days"):
+                            unusual_txns = anomalous_transactions(df_filtered, unusual_days)
+                            unusual_txns['date'] = unusual_txns['date'].dt.strftime('%Y-%m-%d')
+                            st.dataframe(
+                                unusual_txns[['date', 'category', 'description', 'amount']],
+                                use_container_width=True, hide_index=True
+                            )
+
                 st.header("Filtered Transaction Data")
                 df_display = df_filtered.drop(columns=['year', 'month_year']).copy()
                 df_display['date'] = df_display['date'].dt.strftime('%Y-%m-%d')
                 
-                cols_to_show = ['category', 'date', 'description', 'amount', 'Income/Expense']
+                cols_to_show = ['category', 'date', 'description', 'amount', 'Income/Expense', 'original_amount', 'currency']
                 df_display = df_display[cols_to_show]
 
                 column_config = {
@@ -335,6 +799,8 @@ if st.session_state["authentication_status"]:
                     "description": st.column_config.TextColumn("Description", disabled=True),
                     "amount": st.column_config.NumberColumn("Amount (₹)", disabled=True),
                     "Income/Expense": st.column_config.TextColumn("Type", disabled=True),
+                    "original_amount": st.column_config.NumberColumn("Original Amount", disabled=True),
+                    "currency": st.column_config.TextColumn("Currency", disabled=True),
                 }
 
                 edited_df = st.data_editor(
@@ -343,181 +809,558 @@ if st.session_state["authentication_status"]:
                 )
 
                 if not edited_df.equals(df_display):
-                    st.session_state.df.update(edited_df)
-                    save_data(username, st.session_state.df)
-                    st.success("Changes saved!")
+                    # Learn from category corrections so the next upload gets them right
+                    common_idx = edited_df.index.intersection(df_display.index)
+                    corrected = common_idx[edited_df.loc[common_idx, 'category'] != df_display.loc[common_idx, 'category']]
+                    for idx in corrected:
+                        if df_display.at[idx, 'Income/Expense'] != 'Income':
+                            st.session_state.category_model.learn(df_display.at[idx, 'description'], edited_df.at[idx, 'category'])
+                    if len(corrected) > 0:
+                        save_category_model(username, st.session_state.category_model)
+
+                    # Only the category can be edited; the other columns are read-only
+                    edits = df_filtered.loc[corrected, EDIT_KEY].assign(category=edited_df.loc[corrected, 'category'])
+                    update_ledger(lambda df: apply_category_edits(df, edits), changed_from=df_filtered['date'].min())
+                    refresh_ledger_stats()
+                    st.session_state.setdefault("notices", []).append("Changes saved!")
                     st.rerun()
+
+                # --- Export the filtered period straight from the saved parquet file ---
+                st.subheader("Export")
+                ecol1, ecol2 = st.columns([1, 2])
+                export_format = ecol1.selectbox("Format", list(EXPORT_FORMATS), label_visibility="collapsed")
+                # An invalid date range would otherwise export the whole ledger
+                if ecol2.button("Prepare Export", disabled=not export_ready) and get_user_data_file(username).exists():
+                    # Only this session's latest export is kept
+                    if "export_folder" in st.session_state:
+                        remove_export(st.session_state.pop("export_folder"))
+                    try:
+                        with st.spinner("Writing export..."):
+                            folder, url, rows = publish_export(
+                                STATIC_DIR, get_user_data_file(username), export_format,
+                                export_file_name(username, export_format, export_start, export_end),
+                                export_start, export_end
+                            )
+                        st.session_state.export_folder = folder
+                        st.link_button(f"Download {rows} rows as {export_format}", url)
+                        st.caption(f"The link works for {EXPORT_TTL_SECONDS // 60} minutes.")
+                    except Exception as e:
+                        st.error(f"Error writing export: {e}")
         else:
             st.info("Upload a file or add a transaction to get started.")
 
+    @st.fragment
+    def goals_panel():
+        st.header("Financial Goal Setting")
+        
+        expense_categories = [cat for cat in ALL_CATEGORIES if cat != 'Income']
+        with st.form("goal_form", clear_on_submit=True):
+            st.write("Set a new monthly spending goal:")
+            goal_cat = st.selectbox("Category", options=expense_categories)
+            goal_amount = st.number_input("Target Monthly Amount (₹)", min_value=1.0)
+            goal_submitted = st.form_submit_button("Set Goal")
 
-    # FORECASTING & GOALS 
-    with tabs[1]:
-        if not st.session_state.df.empty:
-            st.header("Financial Goal Setting")
-            
-            expense_categories = [cat for cat in ALL_CATEGORIES if cat != 'Income']
-            with st.form("goal_form", clear_on_submit=True):
-                st.write("Set a new monthly spending goal:")
-                goal_cat = st.selectbox("Category", options=expense_categories)
-                goal_amount = st.number_input("Target Monthly Amount (₹)", min_value=1.0)
-                goal_submitted = st.form_submit_button("Set Goal")
-
-                if goal_submitted:
-                    # Remove old goal for the same category if it exists
-                    st.session_state.goals = [g for g in st.session_state.goals if g['category'] != goal_cat]
-                    # Add new goal
-                    st.session_state.goals.append({"category": goal_cat, "amount": goal_amount})
-                    save_goals(username, st.session_state.goals)
-                    st.success(f"Goal set for {goal_cat}: {format_indian_currency(goal_amount)} per month.")
-
-            #  Display Current Goals 
-            if st.session_state.goals:
-                st.subheader("Your Current Goals")
-                goal_cols = st.columns(len(st.session_state.goals))
-                for i, goal in enumerate(st.session_state.goals):
-                    with goal_cols[i]:
-                        st.metric(
-                            label=f"Goal: {goal['category']}",
-                            value=format_indian_currency(goal['amount'])
-                        )
+            if goal_submitted:
+                # Remove old goal for the same category if it exists
+                st.session_state.goals = [g for g in st.session_state.goals if g['category'] != goal_cat]
+                # Add new goal
+                st.session_state.goals.append({"category": goal_cat, "amount": goal_amount})
+                save_goals(username, st.session_state.goals)
+                st.session_state.setdefault("notices", []).append(
+                    f"Goal set for {goal_cat}: {format_indian_currency(goal_amount)} per month.")
+                # The what-if and forecast panels read the goals too
+                st.rerun(scope="app")
 
+        #  Display Current Goals 
+        if st.session_state.goals:
+            st.subheader("Your Current Goals")
+            st.caption("Month-to-date spend and projected month-end spend at the current burn rate.")
+            progress = goal_progress(st.session_state.month_totals, st.session_state.goals)
+            goal_cols = st.columns(len(progress))
+            for i, row in enumerate(progress.itertuples(index=False)):
+                with goal_cols[i]:
+                    st.metric(
+                        label=f"Goal: {row.category}",
+                        value=format_indian_currency(row.spent),
+                        delta=f"{format_indian_currency(row.remaining)} left",
+                        delta_color="normal" if row.remaining >= 0 else "inverse"
+                    )
+                    st.progress(min(row.pct_used / 100, 1.0), text=f"{row.pct_used:.0f}% of {format_indian_currency(row.goal)}")
+                    st.caption(f"Burn rate {format_indian_currency(row.burn_rate)}/day · "
+                               f"projected {format_indian_currency(row.projected)}")
+                    if row.over_budget:
+                        st.error("Over budget")
+                    elif row.projected_over:
+                        st.warning("On pace to exceed")
+
+    @st.fragment
+    def what_if_panel():
+        st.header("🎲 What If")
+        if not st.session_state.goals:
+            st.info("Set a goal above to see how likely you are to meet it.")
+            return
+        progress = goal_progress(st.session_state.month_totals, st.session_state.goals)
+        categories = list(progress['category'])
+        days = days_left_in_month()
+
+        sources = ["Recent days"]
+        precomputed = load_precomputed(DATA_DIR, username)
+        if precomputed is not None and not precomputed[1].empty:
+            sources.append("Overnight forecast")
+        source = st.radio("Simulate the rest of the month from", sources, horizontal=True,
+                          help="Recent days replays whole days from your last 90 days of spending")
+
+        st.write("Try cutting spending for the rest of the month:")
+        cut_cols = st.columns(len(categories))
+        cuts = {
+            cat: cut_cols[i].slider(cat, 0, 50, 0, step=5, format="-%d%%", key=f"what_if_cut_{cat}") / 100
+            for i, cat in enumerate(categories)
+        }
+
+        future = None
+        if source == "Overnight forecast":
+            future = forecast_paths(precomputed[1], categories, days)
+            if future is None:
+                st.caption("The overnight forecast doesn't cover every goal for this month; using recent days instead.")
+        if future is None:
+            history = derived("daily_history", lambda df: daily_history(df[df['Income/Expense'] == 'Expense']))
+            future = bootstrap_paths(history, categories, days)
+        outcome = simulate_goals(progress, future, cuts)
+
+        st.caption(f"{N_PATHS:,} simulated ways the remaining {days} days of this month could go.")
+        st.dataframe(
+            outcome,
+            column_config={
+                "category": "Category",
+                "goal": st.column_config.NumberColumn("Goal (₹)", format="%.2f"),
+                "spent": st.column_config.NumberColumn("Spent So Far (₹)", format="%.2f"),
+                "p_under": st.column_config.ProgressColumn("Chance Under Goal", format="percent", min_value=0, max_value=1),
+                "p_under_cut": st.column_config.ProgressColumn("With Cuts", format="percent", min_value=0, max_value=1),
+                "median": st.column_config.NumberColumn("Likely Month-End (₹)", format="%.2f"),
+                "p90": st.column_config.NumberColumn("Bad Case, 1 in 10 (₹)", format="%.2f"),
+            },
+            use_container_width=True, hide_index=True
+        )
+
+    @st.fragment
+    def insights_panel():
+        # Benchmarks against other users
+        st.header("👥 How You Compare")
+        comparison = compare(complete_months(st.session_state.month_totals), load_benchmarks())
+        if comparison.empty:
+            st.info(f"Benchmarks appear once at least {MIN_USERS} users have a full month of spending in a category.")
+        else:
+            st.caption("Your average monthly spend against all users' monthly spend. No one else's transactions are shown or read.")
+            st.dataframe(
+                comparison.drop(columns=['users']),
+                column_config={
+                    "category": "Category",
+                    "yours": st.column_config.NumberColumn("You (₹/month)", format="%.2f"),
+                    "median": st.column_config.NumberColumn("Typical User (₹)", format="%.2f"),
+                    "p75": st.column_config.NumberColumn("75th Percentile (₹)", format="%.2f"),
+                    "percentile": st.column_config.ProgressColumn(
+                        "You Spend More Than", format="%.0f%%", min_value=0, max_value=100
+                    ),
+                },
+                use_container_width=True, hide_index=True
+            )
+
+        st.divider()
+
+        # Recurring payments
+        st.header("🔁 Subscriptions & Recurring Payments")
+        recurring = st.session_state.recurring
+        active_recurring = recurring[recurring['is_active']]
+        if active_recurring.empty:
+            st.info("No recurring payments detected yet. They show up after three regular charges.")
+        else:
+            st.metric("Estimated Monthly Recurring Cost", format_indian_currency(monthly_cost(recurring)))
+            recurring_display = active_recurring.copy()
+            recurring_display['last_date'] = recurring_display['last_date'].dt.strftime('%Y-%m-%d')
+            recurring_display['next_date'] = recurring_display['next_date'].dt.strftime('%Y-%m-%d')
+            st.dataframe(
+                recurring_display[['description', 'cadence', 'amount', 'occurrences', 'last_date', 'next_date']],
+                column_config={
+                    "description": "Latest Charge", "cadence": "Cadence",
+                    "amount": st.column_config.NumberColumn("Typical Amount (₹)", format="%.2f"),
+                    "occurrences": "Times Charged",
+                    "last_date": "Last Charged", "next_date": "Next Expected",
+                },
+                use_container_width=True, hide_index=True
+            )
+
+    def run_on_pool(label, fn, arg_lists):
+        """
+        Runs forecast work on the shared pool, one job per argument tuple, and
+        shows the queue position while waiting. Returns the results in order.
+        """
+        pool = get_forecast_pool()
+        jobs = [pool.submit(username, fn, *args) for args in arg_lists]
+        with st.status(label) as status:
+            def report(ahead, finished, total):
+                if ahead:
+                    status.update(label=f"{label} ({ahead} job(s) ahead of you in the queue)")
+                elif total > 1:
+                    status.update(label=f"{label} ({finished} of {total} done)")
+            results = wait_for(pool, jobs, report)
+            status.update(label=label.rstrip(".") + " - done", state="complete")
+        return results
+
+    @st.fragment
+    def forecast_panel():
+        #  Forecasting Section
+        st.header("Expense Forecasting")
+
+        # Projections fitted overnight by forecast_scheduler.py, shown without waiting for a fit
+        precomputed = load_precomputed(DATA_DIR, username)
+        if precomputed is not None and precomputed[0]['projections']:
+            meta, precomputed_frame = precomputed
+            age, stale_reason = staleness(meta, get_user_data_file(username))
+            hours = age.total_seconds() / 3600
+            age_text = f"{hours:.0f} hours ago" if hours >= 1 else "less than an hour ago"
+            st.subheader("Goal Projections")
+            if stale_reason:
+                st.warning(f"⏳ Computed {age_text}, {stale_reason}. Generate a forecast below for current numbers.")
+            else:
+                st.caption(f"✅ Computed {age_text} for the next {meta['periods']} days.")
+            goal_by_cat = {g['category']: g['amount'] for g in st.session_state.goals}
+            projection_table = pd.DataFrame({
+                'Category': list(meta['projections']),
+                'Projected Monthly (₹)': list(meta['projections'].values()),
+            })
+            projection_table['Goal (₹)'] = projection_table['Category'].map(goal_by_cat)
+            projection_table['Over Goal'] = projection_table['Projected Monthly (₹)'] > projection_table['Goal (₹)']
+            st.dataframe(projection_table, use_container_width=True, hide_index=True,
+                         column_config={
+                             "Projected Monthly (₹)": st.column_config.NumberColumn(format="%.2f"),
+                             "Goal (₹)": st.column_config.NumberColumn(format="%.2f"),
+                         })
+            if not precomputed_frame.empty:
+                fig_precomputed = px.line(precomputed_frame, x='ds', y='yhat', color='category',
+                                          title="Daily Spending Forecast",
+                                          labels={'ds': 'Date', 'yhat': 'Amount (₹)', 'category': 'Category'})
+                st.plotly_chart(fig_precomputed, use_container_width=True)
             st.divider()
 
-            #  Forecasting Section
-            st.header("Expense Forecasting")
-            
-            # Prepare data for forecasting
-            df_expense = st.session_state.df[st.session_state.df['Income/Expense'] == 'Expense'].copy()
-            
-            if df_expense.empty:
-                st.warning("You have no expense data to forecast.")
+        # Prepare data for forecasting
+        df_expense = derived("expense", lambda df: df[df['Income/Expense'] == 'Expense'].copy())
+        
+        if df_expense.empty:
+            st.warning("You have no expense data to forecast.")
+        else:
+            # Rolling-origin backtests, saved until the ledger changes
+            st.subheader("Forecast Accuracy")
+            backtests = load_backtests(DATA_DIR, username, get_user_data_file(username))
+            if st.button("Run Backtest", help="Tests each forecasting engine on your past months, all categories in parallel"):
+                categories = [TOTAL] + sorted(df_expense['category'].unique())
+                try:
+                    backtests = backtest_frame(run_on_pool(f"Backtesting {len(categories)} categories...", backtest_series,
+                                                           [(c, daily_series(df_expense, c)) for c in categories]))
+                    save_backtests(DATA_DIR, username, backtests, get_user_data_file(username))
+                except RuntimeError as e:
+                    st.error(f"Backtest failed: {e}")
+            best = best_engines(backtests) if backtests is not None else None
+            if best is None:
+                st.caption("Run a backtest to see how far off past forecasts were and which engine suits each category.")
+            elif best.empty:
+                st.info("Not enough history to backtest yet.")
             else:
-                forecast_cat_options = ['All Expenses'] + sorted(df_expense['category'].unique())
+                prophet_scores = backtests[backtests['engine'] == 'prophet'].set_index('category')
+                accuracy_table = pd.DataFrame({
+                    'Category': best.index,
+                    'Best Engine': best['engine'].map(ENGINES).to_numpy(),
+                    'MAPE': best['mape'].to_numpy(),
+                    'MAE (₹/month)': monthly_error(best['mae']).to_numpy(),
+                    'Prophet MAPE': prophet_scores['mape'].reindex(best.index).to_numpy(),
+                })
+                st.dataframe(accuracy_table, use_container_width=True, hide_index=True,
+                             column_config={
+                                 "MAPE": st.column_config.NumberColumn(format="percent"),
+                                 "Prophet MAPE": st.column_config.NumberColumn(format="percent"),
+                                 "MAE (₹/month)": st.column_config.NumberColumn(format="%.2f"),
+                             })
+                st.caption("MAPE is how far off the forecast 30-day total was; single forecasts below use the best engine.")
+            st.divider()
+
+            forecast_mode = st.radio(
+                "Forecast", ["Single category", "Category breakdown"], horizontal=True,
+                help="Category breakdown forecasts every category at once and makes them add up to the total."
+            )
+            forecast_days = st.slider("Select forecast period (days)", 30, 365, 90)
+            train_windows = {None: "All history", 730: "Last 2 years", 365: "Last year"}
+            max_train_days = st.selectbox("Train on", list(train_windows), format_func=train_windows.get,
+                                          help="A shorter window fits faster and follows recent habits more closely")
+
+            if forecast_mode == "Single category":
+                forecast_cat_options = [TOTAL] + sorted(df_expense['category'].unique())
                 forecast_cat = st.selectbox("Select category to forecast", options=forecast_cat_options)
-                forecast_days = st.slider("Select forecast period (days)", 30, 365, 90)
 
-                if st.button("Generate Forecast"):
-                    
-                    # 1. Historical Data Preparation
-                    if forecast_cat == 'All Expenses':
-                        df_to_forecast = df_expense
+            if forecast_mode == "Single category" and st.button("Generate Forecast"):
+                
+                # 1. Historical Data Preparation (aggregated by day)
+                df_prophet = daily_series(df_expense, forecast_cat)
+
+                if len(df_prophet) < MIN_HISTORY_DAYS:
+                    st.error("Not enough data to create a forecast. Please add more transactions.")
+                else:
+                    # 2. Prophet Integration, starting from this category's last fit (or last night's)
+                    warm_starts = st.session_state.setdefault("warm_starts", {})
+                    init = warm_starts.get(forecast_cat)
+                    if init is None and precomputed is not None:
+                        init = precomputed[0].get('params', {}).get(forecast_cat)
+                    try:
+                        model_json, forecast, params = run_on_pool("Training model and generating forecast...", fit_job,
+                                                                   [(df_prophet, forecast_days, init, max_train_days)])[0]
+                    except RuntimeError as e:
+                        st.error(f"Forecast failed: {e}")
+                        return
+                    warm_starts[forecast_cat] = params
+                    m = model_from_json(model_json)
+
+                    # 3. Forecast Visualization
+                    st.subheader(f"Forecast for {forecast_cat}")
+                    fig = plot_plotly(m, forecast)
+                    fig.update_layout(
+                        title=f"{forecast_cat} Spending Forecast",
+                        xaxis_title="Date",
+                        yaxis_title="Amount (₹)"
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
+
+                    # 4. Show projected spending vs. goals, from the engine that backtested best
+                    engine = best.at[forecast_cat, 'engine'] if best is not None and forecast_cat in best.index else 'prophet'
+                    if engine == 'prophet':
+                        projected_monthly = projected_monthly_spend(forecast, forecast_days)
                     else:
-                        df_to_forecast = df_expense[df_expense['category'] == forecast_cat]
+                        projected_monthly = forecast_with(engine, df_prophet, forecast_days).mean() * DAYS_PER_MONTH
 
-                    # Aggregate by day
-                    df_prophet = df_to_forecast.set_index('date').resample('D')['amount'].sum().reset_index()
-                    df_prophet.columns = ['ds', 'y'] 
+                    st.subheader("Forecast vs. Goal")
+                    if best is not None and forecast_cat in best.index and pd.notna(best.at[forecast_cat, 'mape']):
+                        st.caption(f"Projected with {ENGINES[engine]}, which was off by "
+                                   f"{best.at[forecast_cat, 'mape']:.0%} on past 30-day totals.")
+                    
+                    # Find the goal for this category
+                    current_goal = None
+                    if forecast_cat != TOTAL:
+                        for g in st.session_state.goals:
+                            if g['category'] == forecast_cat:
+                                current_goal = g
+                                break
+                    
+                    if current_goal:
+                        goal_amount = current_goal['amount']
+                        diff = projected_monthly - goal_amount
+                        
+                        kpi_col1, kpi_col2 = st.columns(2)
+                        kpi_col1.metric(
+                            label=f"Projected Monthly Spend ({forecast_cat})",
+                            value=format_indian_currency(projected_monthly)
+                        )
+                        kpi_col2.metric(
+                            label=f"Your Goal ({forecast_cat})",
+                            value=format_indian_currency(goal_amount),
+                            delta=format_indian_currency(diff),
+                            delta_color="inverse" if diff <= 0 else "normal"
+                        )
+                        if diff <= 0:
+                            st.success("🎉 You are on track to meet your goal!")
+                        else:
+                            st.warning("You are currently projected to spend *more* than your goal.")
+                    else:
+                        st.metric(
+                            label=f"Projected Monthly Spend ({forecast_cat})",
+                            value=format_indian_currency(projected_monthly)
+                        )
+                        if forecast_cat != TOTAL:
+                            st.info(f"You have no goal set for {forecast_cat}. You can set one above.")
 
-                    if len(df_prophet) < 7:
+            if forecast_mode == "Category breakdown":
+                reconcile_method = st.selectbox(
+                    "Reconciliation", ["mint", "bottom_up"],
+                    format_func=lambda m: {"mint": "MinT (weighted by fit accuracy)", "bottom_up": "Bottom-up (sum of categories)"}[m]
+                )
+                if st.button("Generate Breakdown"):
+                    if df_expense['date'].dt.normalize().nunique() < MIN_HISTORY_DAYS:
                         st.error("Not enough data to create a forecast. Please add more transactions.")
                     else:
-                        with st.spinner("Training model and generating forecast..."):
-                            # 2. Prophet Integration
-                            m = Prophet()
-                            m.fit(df_prophet)
-                            future = m.make_future_dataframe(periods=forecast_days)
-                            forecast = m.predict(future)
-
-                            # 3. Forecast Visualization
-                            st.subheader(f"Forecast for {forecast_cat}")
-                            fig = plot_plotly(m, forecast)
-                            fig.update_layout(
-                                title=f"{forecast_cat} Spending Forecast",
-                                xaxis_title="Date",
-                                yaxis_title="Amount (₹)"
-                            )
-                            st.plotly_chart(fig, use_container_width=True)
-
-                            # 4. Show projected spending vs. goals
-                            # Get the average monthly spend from the forecast
-                            forecast_period_df = forecast.set_index('ds').tail(forecast_days)
-                            avg_daily_spend = forecast_period_df['yhat'].mean()
-                            projected_monthly_spend = avg_daily_spend * 30.44 
-
-                            st.subheader("Forecast vs. Goal")
-                            
-                            # Find the goal for this category
-                            current_goal = None
-                            if forecast_cat != 'All Expenses':
-                                for g in st.session_state.goals:
-                                    if g['category'] == forecast_cat:
-                                        current_goal = g
-                                        break
-                            
-                            if current_goal:
-                                goal_amount = current_goal['amount']
-                                diff = projected_monthly_spend - goal_amount
-                                
-                                kpi_col1, kpi_col2 = st.columns(2)
-                                kpi_col1.metric(
-                                    label=f"Projected Monthly Spend ({forecast_cat})",
-                                    value=format_indian_currency(projected_monthly_spend)
-                                )
-                                kpi_col2.metric(
-                                    label=f"Your Goal ({forecast_cat})",
-                                    value=format_indian_currency(goal_amount),
-                                    delta=format_indian_currency(diff),
-                                    delta_color="inverse" if diff <= 0 else "normal"
-                                )
-                                if diff <= 0:
-                                    st.success("🎉 You are on track to meet your goal!")
-                                else:
-                                    st.warning("You are currently projected to spend *more* than your goal.")
-                            else:
-                                st.metric(
-                                    label=f"Projected Monthly Spend ({forecast_cat})",
-                                    value=format_indian_currency(projected_monthly_spend)
-                                )
-                                if forecast_cat != 'All Expenses':
-                                    st.info(f"You have no goal set for {forecast_cat}. You can set one above.")
+                        try:
+                            # One job per series, so the fits spread over the pool; reconciled here
+                            wide, series = hierarchy_series(df_expense, reconcile_method)
+                            fits = run_on_pool(f"Fitting {len(series)} series...", fit_node,
+                                               [(s, forecast_days) for s in series.values()])
+                            breakdown = reconcile_fits(wide, dict(zip(series, fits)), reconcile_method)
+                        except RuntimeError as e:
+                            st.error(f"Forecast failed: {e}")
+                            return
+
+                        future_part = breakdown[breakdown['is_forecast']].drop(columns=['is_forecast'])
+                        category_cols = [c for c in future_part.columns if c != TOTAL]
+
+                        st.subheader("Forecast by Category")
+                        area_df = future_part[category_cols].clip(lower=0).reset_index().melt(
+                            id_vars='ds', var_name='category', value_name='amount'
+                        )
+                        fig_breakdown = px.area(area_df, x='ds', y='amount', color='category',
+                                                title=f"Daily Spending Forecast ({forecast_days} days)",
+                                                labels={'ds': 'Date', 'amount': 'Amount (₹)'})
+                        st.plotly_chart(fig_breakdown, use_container_width=True)
+
+                        # Projected monthly spend per category, next to any goal
+                        goal_by_cat = {g['category']: g['amount'] for g in st.session_state.goals}
+                        monthly = future_part.mean() * DAYS_PER_MONTH
+                        breakdown_table = pd.DataFrame({
+                            'Category': monthly.index,
+                            'Projected Monthly (₹)': monthly.to_numpy(),
+                            'Goal (₹)': [goal_by_cat.get(c) for c in monthly.index],
+                        })
+                        breakdown_table['Over Goal'] = breakdown_table['Projected Monthly (₹)'] > breakdown_table['Goal (₹)'].astype(float)
+                        st.dataframe(breakdown_table, use_container_width=True, hide_index=True,
+                                     column_config={
+                                         "Projected Monthly (₹)": st.column_config.NumberColumn(format="%.2f"),
+                                         "Goal (₹)": st.column_config.NumberColumn(format="%.2f"),
+                                     })
+                        st.caption("Category forecasts are reconciled so they add up to the All Expenses forecast.")
+
+    @st.fragment
+    def admin_panel():
+        st.header("🔒 Administrator Dashboard")
+        st.markdown("---")
+        
+        # 1. System Stats Logic
+        total_users = user_store.count()
+        
+        # Scan all parquet files in user_data folder
+        all_files = glob.glob(str(DATA_DIR / "data_*.parquet"))
+        total_transactions = 0
+        total_volume = 0
+        
+        for f in all_files:
+            try:
+                # The row count is in the file footer, and only the amount column is read
+                total_transactions += pq.ParquetFile(f).metadata.num_rows
+                total_volume += pd.read_parquet(f, columns=['amount'])['amount'].sum()
+            except:
+                pass
+
+        a1, a2, a3 = st.columns(3)
+        a1.metric("Total Users Registered", total_users)
+        a2.metric("Total System Transactions", total_transactions)
+        a3.metric("Total Transaction Volume", format_indian_currency(total_volume))
+        
+        st.markdown("---")
+        
+        # 2. User Management View
+        st.subheader("User Directory")
+        ucol1, ucol2 = st.columns([2, 1])
+        user_search = ucol1.text_input("Search by username or email", placeholder="Starts with...")
+        page_count = max(1, -(-total_users // ADMIN_PAGE_SIZE))
+        user_page = ucol2.number_input("Page", min_value=1, max_value=page_count, value=1)
+        user_data = []
+        for u, details in user_store.page((user_page - 1) * ADMIN_PAGE_SIZE, ADMIN_PAGE_SIZE, user_search):
+            user_data.append({
+                "Username": u,
+                "Name": f"{details['first_name']} {details['last_name']}",
+                "Email": details['email'],
+                "Role": details['roles'][0] if details['roles'] else 'user',
+                "Status": "Logged In" if details.get('logged_in') else "Offline"
+            })
+        st.dataframe(pd.DataFrame(user_data), use_container_width=True)
+        st.caption(f"Page {user_page} of {page_count} · {ADMIN_PAGE_SIZE} users per page")
+
+        st.markdown("---")
+
+        # 3. Exchange rates used to convert foreign-currency statements
+        st.subheader("Exchange Rates")
+        rates = current_rates()
+        if rates.empty:
+            st.info("No exchange rates yet, so only rupee statements can be added.")
+        else:
+            latest = rates.groupby('currency').agg(rates=('rate', 'size'), latest_date=('date', 'max'), latest_rate=('rate', 'last'))
+            st.dataframe(latest.reset_index(), use_container_width=True, hide_index=True)
+        rates_upload = st.file_uploader("Add rates (CSV with date, currency, rate in ₹ per unit)", type=["csv"])
+        if rates_upload is not None and st.button("Import Rates"):
+            try:
+                merge_rates(get_rates_file(), pd.read_csv(rates_upload))
+                st.success("Exchange rates updated.")
+            except Exception as e:
+                st.error(f"Error importing rates: {e}")
+
+        st.markdown("---")
+        st.success("System Operational - Parquet Database Active")
+
+    st.title("Buddy With Brain 🧠")
+    st.header("My Personal Expense Analyzer")
+
+    # Bring in the older history once the background read has finished
+    backfill = st.session_state.get("backfill")
+    if backfill is not None and backfill.done:
+        if backfill.error:
+            st.error(f"Could not load your older transactions: {backfill.error}")
+        else:
+            merge_history()
+    st.fragment(show_history_status, run_every=None if history_complete() else 1)()
+    st.fragment(check_for_new_rows, run_every=CHANGE_POLL_SECONDS)()
+
+    # Save uploads that finished in the background since the last run
+    for job in upload_queue.finished_jobs(username):
+        if job.status == 'failed':
+            upload_queue.discard(job.job_id)
+            st.error(f"Error: Could not read '{job.file_name}'. Details: {job.error}")
+        else:
+            # Kept until the save succeeds, so an interrupted save is retried on the next run
+            update_ledger(lambda df: pd.concat([df, job.result], ignore_index=True),
+                          changed_from=pd.to_datetime(job.result['date']).min())
+            upload_queue.discard(job.job_id)
+            record_new_transactions(job.result)
+            st.success(f"File '{job.file_name}' loaded and saved ({len(job.result)} rows).")
+    show_notices()
+
+    # --- Create two columns for input ---
+    col1, col2 = st.columns(2)
+
+    with col1:
+        upload_panel()
+        has_active_jobs = bool(upload_queue.jobs_for(username))
+        st.fragment(show_upload_status, run_every=1 if has_active_jobs else None)()
+
+    with col2:
+        manual_entry_panel()
+
+    # --- 5. TABS FOR DASHBOARD AND FORECASTING ---
+    
+    #  Dynamic Tab Logic 
+    tabs_list = ["📊 Analysis Dashboard", "📈 Forecasting & Goals"]
+    if user_roles and 'admin' in user_roles:
+        tabs_list.append("🔒 Admin Dashboard")
+    
+    # Create tabs (unpack only what we need)
+    tabs = st.tabs(tabs_list)
+    # ---------------------------------------------
+
+    # --- ANALYSIS DASHBOARD ---
+    with tabs[0]:
+        dashboard_panel()
+
+    # FORECASTING & GOALS 
+    with tabs[1]:
+        if not st.session_state.df.empty:
+            goals_panel()
+            st.divider()
+            if history_complete():
+                what_if_panel()
+                st.divider()
+                insights_panel()
+                st.divider()
+                forecast_panel()
+            else:
+                st.info("⏳ Benchmarks, recurring payments and forecasts appear once your full history has loaded.")
         else:
              st.info("Upload a file or add a transaction to get started.")
 
     # Admin Dashboard (Only visible to Admin) 
     if user_roles and 'admin' in user_roles:
         with tabs[2]:
-            st.header("🔒 Administrator Dashboard")
-            st.markdown("---")
-            
-            # 1. System Stats Logic
-            total_users = len(config['credentials']['usernames'])
-            
-            # Scan all parquet files in user_data folder
-            all_files = glob.glob(str(DATA_DIR / "data_*.parquet"))
-            total_transactions = 0
-            total_volume = 0
-            
-            for f in all_files:
-                try:
-                    temp_df = pd.read_parquet(f)
-                    total_transactions += len(temp_df)
-                    total_volume += temp_df['amount'].sum()
-                except:
-                    pass
-
-            a1, a2, a3 = st.columns(3)
-            a1.metric("Total Users Registered", total_users)
-            a2.metric("Total System Transactions", total_transactions)
-            a3.metric("Total Transaction Volume", format_indian_currency(total_volume))
-            
-            st.markdown("---")
-            
-            # 2. User Management View
-            st.subheader("User Directory")
-            user_data = []
-            for u, details in config['credentials']['usernames'].items():
-                user_data.append({
-                    "Username": u,
-                    "Name": f"{details['first_name']} {details['last_name']}",
-                    "Email": details['email'],
-                    "Role": details['roles'][0] if details['roles'] else 'user',
-                    "Status": "Logged In" if details.get('logged_in') else "Offline"
-                })
-            st.dataframe(pd.DataFrame(user_data), use_container_width=True)
-
-            st.markdown("---")
-            st.success("System Operational - Parquet Database Active")
+            admin_panel()
     # ----------------------------------------------------------------
 
 
@@ -532,8 +1375,6 @@ else:
         try:
             if authenticator.register_user():
                 st.success('User registered successfully! Please go to the Login tab.')
-                with open('config.yaml', 'w') as file:
-                    yaml.dump(config, file, default_flow_style=False)
         except Exception as e:
             st.error(e)
 
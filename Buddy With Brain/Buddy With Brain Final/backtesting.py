@@ -0,0 +1,118 @@
+import json
+import numpy as np
+import pandas as pd
+from forecasting import DAYS_PER_MONTH, fit_forecast
+
+# --- Forecast backtesting ---
+# Rolling-origin evaluation: for the last few cutoffs, each engine is fitted on
+# the days before the cutoff and scored on the days after it. Every category
+# is evaluated as its own job on the shared forecast pool, and the results are
+# saved next to the ledger so the forecast tab only recomputes them after the
+# ledger changes.
+#
+# MAE is the mean absolute daily error. MAPE is the error of the horizon's total
+# spend (what the goal projection is built from), since daily spend is mostly
+# zero days and a daily percentage error would be undefined.
+
+HORIZON_DAYS = 30
+N_FOLDS = 3
+MIN_TRAIN_DAYS = 60
+SEASON_DAYS = 7
+AVERAGE_DAYS = 28
+
+RESULT_COLUMNS = ['category', 'engine', 'folds', 'mae', 'mape']
+
+ENGINES = {
+    'prophet': "Prophet",
+    'seasonal_naive': "Same weekday last week",
+    'moving_average': f"{AVERAGE_DAYS}-day average",
+}
+
+
+def forecast_with(engine, series, periods):
+    """The next `periods` daily values of a ds/y series from one engine."""
+    y = series['y'].to_numpy(dtype=float)
+    if engine == 'seasonal_naive':
+        return np.resize(y[-SEASON_DAYS:], periods)
+    if engine == 'moving_average':
+        return np.full(periods, y[-AVERAGE_DAYS:].mean())
+    if engine == 'prophet':
+        _, forecast = fit_forecast(series, periods)
+        return forecast['yhat'].to_numpy()[-periods:]
+    raise ValueError(f"Unknown forecast engine: {engine}")
+
+
+def rolling_origins(n_days, horizon=HORIZON_DAYS, folds=N_FOLDS, min_train=MIN_TRAIN_DAYS):
+    """Cutoff positions, oldest first, each followed by a full horizon of actuals."""
+    cutoffs = [n_days - horizon * (i + 1) for i in range(folds)]
+    return [c for c in reversed(cutoffs) if c >= min_train]
+
+
+def backtest_series(category, series, horizon=HORIZON_DAYS, folds=N_FOLDS):
+    """Scores every engine on one category's series. Runs in a worker process."""
+    rows = []
+    cutoffs = rolling_origins(len(series), horizon, folds)
+    for engine in ENGINES:
+        abs_errors, total_errors = [], []
+        for cutoff in cutoffs:
+            train = series.iloc[:cutoff]
+            actual = series['y'].to_numpy(dtype=float)[cutoff:cutoff + horizon]
+            if (train['y'] != 0).sum() < 2:
+                predicted = np.zeros(horizon)
+            else:
+                predicted = forecast_with(engine, train, horizon)
+            abs_errors.append(np.abs(predicted - actual).mean())
+            actual_total = actual.sum()
+            total_errors.append(abs(predicted.sum() - actual_total) / actual_total if actual_total > 0 else np.nan)
+        rows.append({
+            'category': category,
+            'engine': engine,
+            'folds': len(cutoffs),
+            'mae': float(np.mean(abs_errors)) if cutoffs else np.nan,
+            'mape': float(np.nanmean(total_errors)) if not np.isnan(total_errors).all() else np.nan,
+        })
+    return rows
+
+
+def backtest_frame(results):
+    """One frame from the per-category lists that backtest_series returns."""
+    return pd.DataFrame([row for category_rows in results for row in category_rows], columns=RESULT_COLUMNS)
+
+
+def best_engines(results):
+    """The engine with the lowest MAPE per category (lowest MAE where MAPE is undefined)."""
+    scored = results[results['folds'] > 0]
+    ranked = scored.sort_values(['category', 'mape', 'mae'], na_position='last', kind='mergesort')
+    return ranked.drop_duplicates('category').set_index('category')
+
+
+def monthly_error(mae):
+    """A daily MAE in rupees per month, to read next to monthly projections."""
+    return mae * DAYS_PER_MONTH
+
+
+def get_backtest_file(data_dir, username):
+    return data_dir / f"backtest_{username}.json"
+
+
+def save_backtests(data_dir, username, results, data_file, horizon=HORIZON_DAYS):
+    with open(get_backtest_file(data_dir, username), 'w') as f:
+        json.dump({
+            'data_mtime': data_file.stat().st_mtime,
+            'horizon': horizon,
+            'results': results.replace({np.nan: None}).to_dict('records'),
+        }, f, indent=4)
+
+
+def load_backtests(data_dir, username, data_file):
+    """The saved results, or None when there are none or the ledger changed since."""
+    backtest_file = get_backtest_file(data_dir, username)
+    if not backtest_file.exists():
+        return None
+    with open(backtest_file) as f:
+        saved = json.load(f)
+    if not data_file.exists() or data_file.stat().st_mtime > saved['data_mtime']:
+        return None
+    return pd.DataFrame(saved['results'], columns=RESULT_COLUMNS).astype(
+        {'mae': float, 'mape': float})
+
@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+import pandas as pd
+
+# --- Bank statement layouts ---
+# A profile maps one bank's columns onto date/description/amount/Income/Expense.
+# The header row is found by its column names, the date format is inferred
+# once from a small sample, and the whole column is then parsed with that
+# explicit format instead of being guessed row by row.
+
+HEADER_SCAN_ROWS = 30
+DATE_SAMPLE_ROWS = 50
+
+# Tried in order, so day-first layouts win over month-first when both parse
+DATE_FORMATS = [
+    '%d-%m-%Y %H:%M', '%d-%m-%Y', '%d/%m/%Y', '%d/%m/%y', '%d-%m-%y', '%d.%m.%Y',
+    '%d %b %Y', '%d-%b-%Y', '%d-%b-%y', '%d %b %y', '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M',
+    '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y/%m/%d',
+    '%m/%d/%Y', '%m/%d/%y', '%b %d, %Y',
+]
+
+# Column names are compared case- and whitespace-insensitively.
+# Either 'amount' (with 'type' or a signed amount) or 'debit' + 'credit' is given.
+# 'date_format' is optional and inferred from the file when missing.
+# 'currency' optionally names a column with each row's currency code.
+BUILTIN_PROFILES = [
+    {'name': 'Buddy With Brain', 'date': 'date', 'description': 'description',
+     'amount': 'amount', 'type': 'Income/Expense'},
+    {'name': 'HDFC Bank', 'date': 'Date', 'description': 'Narration',
+     'debit': 'Withdrawal Amt.', 'credit': 'Deposit Amt.'},
+    {'name': 'ICICI Bank', 'date': 'Transaction Date', 'description': 'Transaction Remarks',
+     'debit': 'Withdrawal Amount (INR )', 'credit': 'Deposit Amount (INR )'},
+    {'name': 'SBI', 'date': 'Txn Date', 'description': 'Description',
+     'debit': 'Debit', 'credit': 'Credit'},
+    {'name': 'Axis Bank', 'date': 'Tran Date', 'description': 'PARTICULARS',
+     'debit': 'DR', 'credit': 'CR'},
+    {'name': 'Kotak', 'date': 'Transaction Date', 'description': 'Description',
+     'amount': 'Amount', 'type': 'Dr / Cr'},
+    {'name': 'Generic signed amount', 'date': 'Date', 'description': 'Description',
+     'amount': 'Amount'},
+]
+
+# Values of a 'type' column that mean money came in
+INCOME_TYPES = {'income', 'cr', 'credit', 'c', 'deposit'}
+
+
+def _norm(name):
+    return ' '.join(str(name).split()).lower()
+
+
+def signature(profile):
+    """Normalized column names a header must contain to match the profile."""
+    keys = ['date', 'description', 'amount', 'type', 'debit', 'credit', 'currency']
+    return {_norm(profile[k]) for k in keys if profile.get(k)}
+
+
+def load_profiles(profiles_file):
+    """Saved profiles first (so they can override a built-in), then the built-ins."""
+    saved = []
+    if profiles_file.exists():
+        try:
+            with open(profiles_file, 'r') as f:
+                saved = json.load(f)
+        except Exception:
+            saved = []
+    return saved + BUILTIN_PROFILES
+
+
+def save_profile(profiles_file, profile):
+    """Adds or replaces a saved profile by name."""
+    saved = []
+    if profiles_file.exists():
+        with open(profiles_file, 'r') as f:
+            saved = json.load(f)
+    saved = [p for p in saved if p['name'] != profile['name']]
+    saved.append(profile)
+    with open(profiles_file, 'w') as f:
+        json.dump(saved, f, indent=4)
+
+
+def match_profile(columns, profiles):
+    """The most specific profile whose columns are all present, or None."""
+    present = {_norm(c) for c in columns}
+    matches = [p for p in profiles if signature(p) <= present]
+    if not matches:
+        return None
+    return max(matches, key=lambda p: len(signature(p)))
+
+
+def infer_date_format(values):
+    """Picks the first format that parses every value of a small sample."""
+    sample = pd.Series(values).dropna().astype(str).str.strip()
+    sample = sample[sample != ''].head(DATE_SAMPLE_ROWS)
+    if sample.empty:
+        return None
+    best, best_parsed = None, 0
+    for fmt in DATE_FORMATS:
+        parsed = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+        if parsed == len(sample):
+            return fmt
+        if parsed > best_parsed:
+            best, best_parsed = fmt, parsed
+    return best
+
+
+def _head_rows(file_name, data):
+    if file_name.endswith('xlsx'):
+        head = pd.read_excel(io.BytesIO(data), header=None, nrows=HEADER_SCAN_ROWS)
+        return [list(row) for row in head.itertuples(index=False)]
+    text = data[:64 * 1024].decode('utf-8-sig', errors='replace')
+    return [row for _, row in zip(range(HEADER_SCAN_ROWS), csv.reader(io.StringIO(text)))]
+
+
+def read_statement(file_name, data, profiles):
+    """
+    Reads a CSV/Excel statement with whichever profile matches its header.
+    Returns (frame with date/description/amount/Income/Expense, profile name).
+    """
+    profile, header_row = None, 0
+    for i, row in enumerate(_head_rows(file_name, data)):
+        profile = match_profile([c for c in row if pd.notna(c)], profiles)
+        if profile is not None:
+            header_row = i
+            break
+    if profile is None:
+        raise ValueError("Unrecognised statement layout. Add a bank format for these columns under 'Bank formats'.")
+
+    if file_name.endswith('xlsx'):
+        raw = pd.read_excel(io.BytesIO(data), skiprows=header_row, dtype=str)
+    else:
+        raw = pd.read_csv(io.BytesIO(data), skiprows=header_row, dtype=str, encoding='utf-8-sig')
+    return apply_profile(raw, profile), profile['name']
+
+
+def _to_amount(values):
+    cleaned = values.astype(str).str.replace(r'[^0-9.\-]', '', regex=True)
+    return pd.to_numeric(cleaned.replace('', None), errors='coerce')
+
+
+def apply_profile(raw, profile):
+    """Maps a statement's columns onto the app's columns, all vectorized."""
+    columns = {_norm(c): c for c in raw.columns}
+
+    def col(key):
+        return raw[columns[_norm(profile[key])]]
+
+    dates = col('date').astype(str).str.strip()
+    date_format = profile.get('date_format') or infer_date_format(dates)
+    df = pd.DataFrame({
+        'date': pd.to_datetime(dates, format=date_format, errors='coerce'),
+        'description': col('description').fillna('').astype(str).str.strip(),
+    })
+
+    if profile.get('debit') and profile.get('credit'):
+        debit = _to_amount(col('debit')).fillna(0).abs()
+        credit = _to_amount(col('credit')).fillna(0).abs()
+        is_income = credit > 0
+        df['amount'] = credit.where(is_income, debit)
+    else:
+        amount = _to_amount(col('amount'))
+        if profile.get('type'):
+            kind = col('type').fillna('').astype(str).str.strip().str.lower()
+            is_income = kind.isin(INCOME_TYPES)
+        else:
+            is_income = amount > 0
+        df['amount'] = amount.abs()
+    df['Income/Expense'] = is_income.map({True: 'Income', False: 'Expense'})
+    if profile.get('currency'):
+        df['currency'] = col('currency').astype(str).str.strip().str.upper().replace({'': None, 'NAN': None})
+
+    # Drop balance/opening rows and blank lines that carry no amount
+    return df[df['amount'].notna() & (df['amount'] > 0)].reset_index(drop=True)
@@ -0,0 +1,138 @@
+import json
+import numpy as np
+import pandas as pd
+
+# --- Cross-user spending benchmarks ---
+# Each user keeps a small t-digest of their monthly spend per category, saved
+# next to their ledger. Benchmarks merge those digests, never the ledgers, and
+# every user carries the same total weight so long histories don't dominate.
+
+COMPRESSION = 100
+LOOKBACK_MONTHS = 12
+MIN_USERS = 5  # below this a category is not shown, to keep it anonymous
+
+
+class TDigest:
+    def __init__(self, means=None, weights=None):
+        self.means = np.asarray(means if means is not None else [], dtype=float)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=float)
+
+    @classmethod
+    def from_values(cls, values, total_weight=1.0):
+        values = np.asarray(values, dtype=float)
+        if values.size == 0:
+            return cls()
+        return cls(values, np.full(values.size, total_weight / values.size))._compress()
+
+    @classmethod
+    def merge_all(cls, digests):
+        digests = [d for d in digests if d.means.size]
+        if not digests:
+            return cls()
+        merged = cls(np.concatenate([d.means for d in digests]), np.concatenate([d.weights for d in digests]))
+        return merged._compress()
+
+    @property
+    def total_weight(self):
+        return float(self.weights.sum())
+
+    def _compress(self):
+        """Merges neighbouring centroids that fall in the same k1 scale bin."""
+        order = np.argsort(self.means, kind='mergesort')
+        means, weights = self.means[order], self.weights[order]
+        total = weights.sum()
+        q = (np.cumsum(weights) - weights / 2) / total
+        # k1 scale: small bins at the tails, wide ones around the median
+        k = np.floor(COMPRESSION / (2 * np.pi) * np.arcsin(2 * np.clip(q, 0, 1) - 1))
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        new_weights = np.add.reduceat(weights, starts)
+        new_means = np.add.reduceat(means * weights, starts) / new_weights
+        return TDigest(new_means, new_weights)
+
+    def _cumulative(self):
+        return (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+
+    def quantile(self, q):
+        if not self.means.size:
+            return np.nan
+        return float(np.interp(q, self._cumulative(), self.means))
+
+    def cdf(self, x):
+        """Share of the weight below x, as a number in [0, 1]."""
+        if not self.means.size:
+            return np.nan
+        return float(np.interp(x, self.means, self._cumulative(), left=0.0, right=1.0))
+
+    def to_dict(self):
+        return {'means': self.means.round(2).tolist(), 'weights': self.weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['means'], data['weights'])
+
+
+def complete_months(month_totals, today=None, lookback=LOOKBACK_MONTHS):
+    """Monthly spend per category (months x categories) for the last complete months."""
+    if month_totals.empty:
+        return pd.DataFrame()
+    today = pd.Timestamp.today() if today is None else pd.Timestamp(today)
+    current = today.to_period('M')
+    wide = month_totals.unstack('category', fill_value=0.0)
+    wide = wide[wide.index < current]
+    if wide.empty:
+        return wide
+    # Months with no spend in a category still count as zero for that category.
+    # The window ends at the user's latest month, so a break in uploads isn't read as zero spend.
+    last = wide.index.max()
+    months = pd.period_range(max(wide.index.min(), last - (lookback - 1)), last, freq='M')
+    return wide.reindex(months, fill_value=0.0)
+
+
+def build_user_sketch(month_totals, today=None):
+    """One digest per category; each carries a total weight of 1 (one user)."""
+    monthly = complete_months(month_totals, today)
+    return {cat: TDigest.from_values(monthly[cat].to_numpy()) for cat in monthly.columns}
+
+
+def save_sketch(sketch_file, sketch):
+    with open(sketch_file, 'w') as f:
+        json.dump({cat: d.to_dict() for cat, d in sketch.items()}, f)
+
+
+def load_sketch(sketch_file):
+    with open(sketch_file, 'r') as f:
+        return {cat: TDigest.from_dict(d) for cat, d in json.load(f).items()}
+
+
+def merge_sketches(sketch_files):
+    """Merges every user's digests per category. Returns {category: (digest, user_count)}."""
+    per_category = {}
+    for sketch_file in sketch_files:
+        try:
+            sketch = load_sketch(sketch_file)
+        except Exception:
+            continue
+        for cat, digest in sketch.items():
+            per_category.setdefault(cat, []).append(digest)
+    return {cat: (TDigest.merge_all(digests), len(digests)) for cat, digests in per_category.items()}
+
+
+def compare(user_sketch_monthly, merged):
+    """
+    Places a user's average monthly spend per category among all users.
+    `user_sketch_monthly` is the output of complete_months for that user.
+    """
+    rows = []
+    for cat, (digest, n_users) in sorted(merged.items()):
+        if n_users < MIN_USERS or cat not in user_sketch_monthly.columns:
+            continue
+        yours = float(user_sketch_monthly[cat].mean())
+        rows.append({
+            'category': cat,
+            'yours': yours,
+            'median': digest.quantile(0.5),
+            'p75': digest.quantile(0.75),
+            'percentile': digest.cdf(yours) * 100,
+            'users': n_users,
+        })
+    return pd.DataFrame(rows, columns=['category', 'yours', 'median', 'p75', 'percentile', 'users'])
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# --- Multi-currency amounts ---
+# Ledgers are kept in rupees. Foreign-currency rows also keep their original
+# amount and currency, and are converted with the rate in force on their date
+# from a local table of historical rates (date, currency, rate = rupees per
+# unit). A whole batch is converted with one as-of join, never row by row, and
+# the rupee amounts are saved with the batch so they are not recomputed.
+
+BASE_CURRENCY = 'INR'
+RATE_COLUMNS = ['date', 'currency', 'rate']
+
+
+def clean_rates(rates):
+    rates = rates[RATE_COLUMNS].copy()
+    rates['date'] = pd.to_datetime(rates['date'], errors='coerce').astype('datetime64[ns]')
+    rates['currency'] = rates['currency'].astype(str).str.strip().str.upper()
+    rates['rate'] = pd.to_numeric(rates['rate'], errors='coerce')
+    rates = rates.dropna()
+    rates = rates[(rates['rate'] > 0) & (rates['currency'] != BASE_CURRENCY)]
+    rates = rates.drop_duplicates(['currency', 'date'], keep='last')
+    return rates.sort_values('date', kind='mergesort', ignore_index=True)
+
+
+def load_rates(rates_file):
+    """The local rate table sorted by date; empty when there is no file yet."""
+    if not rates_file.exists():
+        return clean_rates(pd.DataFrame(columns=RATE_COLUMNS))
+    return clean_rates(pd.read_csv(rates_file))
+
+
+def merge_rates(rates_file, new_rates):
+    """Adds rates to the local table; a new rate replaces an old one for the same day."""
+    combined = clean_rates(pd.concat([load_rates(rates_file), clean_rates(new_rates)], ignore_index=True))
+    combined.to_csv(rates_file, index=False, date_format='%Y-%m-%d')
+    return combined
+
+
+def available_currencies(rates):
+    return [BASE_CURRENCY] + sorted(rates['currency'].unique())
+
+
+def rates_on(dates, currencies, rates):
+    """
+    Rupees per unit for each (date, currency): the latest rate on or before
+    the date, or the earliest known rate for dates before the table starts.
+    NaN where the currency has no rates at all (or `rates` is None).
+    """
+    query = pd.DataFrame({
+        'date': pd.to_datetime(pd.Series(dates)).astype('datetime64[ns]').to_numpy(),
+        'currency': pd.Series(currencies).fillna(BASE_CURRENCY).astype(str).str.strip().str.upper().to_numpy(),
+        'row': np.arange(len(dates)),
+    })
+    rate = np.where(query['currency'] == BASE_CURRENCY, 1.0, np.nan)
+    foreign = query[(query['currency'] != BASE_CURRENCY) & query['date'].notna()]
+    if foreign.empty or rates is None or rates.empty:
+        return rate
+
+    foreign = foreign.sort_values('date', kind='mergesort')
+    joined = pd.merge_asof(foreign, rates, on='date', by='currency', direction='backward')
+    before_table = joined['rate'].isna().to_numpy()
+    if before_table.any():
+        earliest = pd.merge_asof(foreign[before_table], rates, on='date', by='currency', direction='forward')
+        joined.loc[before_table, 'rate'] = earliest['rate'].to_numpy()
+    rate[joined['row'].to_numpy()] = joined['rate'].to_numpy()
+    return rate
+
+
+def to_inr(df, rates):
+    """
+    Sets `amount` to rupees from `original_amount` and `currency` for a batch
+    of rows. Rows without those columns are taken as rupees. Raises
+    ValueError naming any currency the rate table doesn't know.
+    """
+    df = df.copy()
+    if 'currency' not in df.columns:
+        df['currency'] = BASE_CURRENCY
+    if 'original_amount' not in df.columns:
+        df['original_amount'] = df['amount']
+    df['currency'] = df['currency'].fillna(BASE_CURRENCY).astype(str).str.strip().str.upper()
+
+    rate = rates_on(df['date'], df['currency'], rates)
+    missing = np.isnan(rate)
+    if missing.any():
+        unknown = sorted(df.loc[missing, 'currency'].unique())
+        raise ValueError(f"No exchange rate for {', '.join(unknown)}. Add rates for it under 'Exchange rates'.")
+    df['amount'] = (pd.to_numeric(df['original_amount']) * rate).round(2)
+    return df
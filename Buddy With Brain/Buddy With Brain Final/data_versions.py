@@ -0,0 +1,84 @@
+import json
+import os
+from contextlib import contextmanager
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:   # Windows: a single worker, nothing to lock against
+    fcntl = None
+
+# --- Per-user data versions ---
+# Several app processes can serve the same user from one shared user_data/
+# directory. Every save bumps a counter in the user's version file, and each
+# run compares it with the versions the session last saw, so only changed users
+# are reloaded. Ledger saves also record the earliest date they touched; the
+# ledger is sorted by date, so a session that missed a few saves reloads just
+# the row groups from that date on instead of the whole file.
+
+KINDS = ('ledger', 'goals', 'model')
+MAX_CHANGES = 50   # ledger changes remembered; a session further behind reloads everything
+
+
+def get_version_file(data_dir, username):
+    return data_dir / f"version_{username}.json"
+
+
+def read_versions(data_dir, username):
+    """The user's current versions; one small file read, all zeros before the first save."""
+    try:
+        with open(get_version_file(data_dir, username)) as f:
+            versions = json.load(f)
+    except (FileNotFoundError, ValueError):
+        versions = {}
+    return {**{kind: 0 for kind in KINDS}, 'ledger_changes': [], **versions}
+
+
+def bump_version(data_dir, username, kind, changed_from=None):
+    """
+    Records a save of `kind`; for the ledger, `changed_from` is the earliest
+    date whose rows changed (None when unknown). Returns the new versions.
+    """
+    version_file = get_version_file(data_dir, username)
+    with open(version_file.with_suffix(".lock"), 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        versions = read_versions(data_dir, username)
+        versions[kind] += 1
+        if kind == 'ledger':
+            start = None if pd.isna(changed_from) else pd.Timestamp(changed_from).normalize().isoformat()
+            versions['ledger_changes'] = (versions['ledger_changes'] + [[versions[kind], start]])[-MAX_CHANGES:]
+        # Replace rather than rewrite, so readers never see half a file
+        tmp_file = version_file.with_suffix(".tmp")
+        with open(tmp_file, 'w') as f:
+            json.dump(versions, f)
+        os.replace(tmp_file, version_file)
+    return versions
+
+
+@contextmanager
+def ledger_lock(data_dir, username):
+    """
+    Held for every read-modify-write of the user's ledger, by app sessions and
+    by ingest_server.py, so no writer replaces the file with a copy that is
+    missing rows another one just wrote. Not reentrant.
+    """
+    with open(data_dir / f"ledger_{username}.lock", 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def ledger_reload_start(seen, current):
+    """
+    What a session at ledger version `seen` has to reread to catch up with
+    `current`: (True, date) to reload rows from `date` on, (True, None) to
+    reload everything, or (False, None) when it is up to date.
+    """
+    if current['ledger'] == seen:
+        return False, None
+    missed = [start for version, start in current['ledger_changes'] if version > seen]
+    # Older changes dropped off the log, or one of them could have touched any date
+    if current['ledger'] < seen or len(missed) != current['ledger'] - seen or None in missed:
+        return True, None
+    return True, min(pd.Timestamp(start) for start in missed)
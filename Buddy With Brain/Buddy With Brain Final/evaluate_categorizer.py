@@ -0,0 +1,212 @@
+import argparse
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from categorynltk import ALL_CATEGORIES, CATEGORIES_KEYWORDS, categorize_expense
+from learned_categorizer import CategoryModel, categorize_batch
+from merchant_matcher import MERCHANT_ALIASES
+
+# --- Categorizer evaluation ---
+# Scores the categorizers against labeled expenses and times them, so a
+# speedup can be checked for lost accuracy before it ships. The labeled set is
+# the bundled expense dataset, whose `Expenses` labels are mapped onto the
+# app's categories (its `Category` column is a necessity class - Survival,
+# Obligation... - not a spending category), plus a synthetic set of bank-style
+# merchant descriptions of any size. The learned model is trained on one part
+# of each set as if those rows were corrections, and all categorizers are
+# scored on the rest. The split is by distinct description: the dataset's
+# description is its label, so a row-level split would score the model on the
+# ~25 strings it was trained on.
+#
+# categorize_batch runs the same keyword rules row by row before its fuzzy and
+# model stages, so it is not expected to be faster than the keywords alone;
+# the throughput table shows how it compares.
+#
+#   python evaluate_categorizer.py --rows 20000
+
+APP_DIR = Path(__file__).resolve().parent
+DATASET_FILE = APP_DIR.parent / "buddy-with-brain-backup" / "Buddy with Brain" / "dataset" / "processed_dataset.csv"
+
+# Dataset labels without a counterpart (debt payments) are left out
+EXPENSE_LABELS = {
+    'Apartment': 'Housing & Rent',
+    'Bank fees': 'Fees & Charges',
+    'Cable': 'Utilities & Bills',
+    'Clothing/Shoes/Personal Items': 'Shopping & Personal',
+    'Credit Card Payment': None,
+    'Debt repayment': None,
+    'Eating/Going Out': 'Food & Groceries',
+    'Electricity/Water': 'Utilities & Bills',
+    'Entertainment/Subscriptions': 'Entertainment & Subscriptions',
+    'Food/Drinks': 'Food & Groceries',
+    'Garbage': 'Utilities & Bills',
+    'Grocery': 'Food & Groceries',
+    'Hair Cut': 'Personal Care',
+    'Health Insurance': 'Insurance',
+    'Healthcare': 'Health & Wellness',
+    'Home': 'Housing & Rent',
+    'Magazines/Newspapers/Books': 'Entertainment & Subscriptions',
+    'Others': 'Other',
+    'Pension Fund': 'Investments & Savings',
+    'Personal care items (drugstore)': 'Personal Care',
+    'PhilHealth': 'Insurance',
+    'Phone/Internet': 'Utilities & Bills',
+    'Revi Credit': None,
+    'SSS': 'Insurance',
+    'Transportation': 'Transport',
+}
+
+TEMPLATES = ["{word}", "POS {ref} {word}*{city}", "UPI/{ref}/{word}/PAYMENT", "{word}{suffix}", "NEFT-{word}-{ref}"]
+CITIES = ["BLR", "MUMBAI", "DELHI", "PUNE", "HYD"]
+SUFFIXES = ["LTD", "PVT", "INDIA", "ONLINE", ".COM"]
+OTHER_DESCRIPTIONS = ["TRANSFER TO SELF", "CASH DEPOSIT", "IMPS REF", "UPI PAYMENT TO FRIEND", "MISC DEBIT"]
+CATEGORIZERS = ['keywords', 'batch', 'batch+model']
+
+
+def load_labeled(path=DATASET_FILE):
+    """(description, category) rows from the bundled dataset (CSV or Excel)."""
+    path = Path(path)
+    raw = pd.read_excel(path) if path.suffix in ('.xlsx', '.xls') else pd.read_csv(path)
+    unknown = sorted(set(raw['Expenses'].dropna()) - set(EXPENSE_LABELS))
+    if unknown:
+        raise ValueError(f"No category mapping for dataset labels: {', '.join(unknown)}")
+    labeled = pd.DataFrame({'description': raw['Expenses'], 'category': raw['Expenses'].map(EXPENSE_LABELS)})
+    return labeled.dropna(ignore_index=True)
+
+
+def synthetic_labeled(rows, seed=0):
+    """Bank-style descriptions built from merchant aliases and single-category keywords."""
+    # Words listed under more than one category have no single right answer
+    pairs = [(w, cat) for source in (CATEGORIES_KEYWORDS, MERCHANT_ALIASES) for cat, ws in source.items() for w in ws]
+    owners = pd.DataFrame(pairs, columns=['word', 'category']).groupby('word')['category'].nunique()
+    words = {cat: sorted(w for w in set(CATEGORIES_KEYWORDS[cat]) | MERCHANT_ALIASES.get(cat, set()) if owners[w] == 1)
+             for cat in CATEGORIES_KEYWORDS if cat != 'Other'}
+    pool = [(w, cat) for cat, ws in words.items() for w in ws] + [(d, 'Other') for d in OTHER_DESCRIPTIONS]
+
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(pool), rows)
+    templates = rng.integers(0, len(TEMPLATES), rows)
+    descriptions = [
+        TEMPLATES[t].format(word=pool[p][0].upper(), ref=rng.integers(10_000, 99_999),
+                            city=CITIES[p % len(CITIES)], suffix=SUFFIXES[p % len(SUFFIXES)])
+        if pool[p][1] != 'Other' else pool[p][0]
+        for p, t in zip(picks, templates)
+    ]
+    return pd.DataFrame({'description': descriptions, 'category': [pool[p][1] for p in picks]})
+
+
+def train_model(train):
+    model = CategoryModel()
+    for description, category in zip(train['description'], train['category']):
+        model.learn(description, category)
+    return model
+
+
+def run_categorizer(name, descriptions, model=None):
+    types = ['Expense'] * len(descriptions)
+    if name == 'keywords':
+        return [categorize_expense(d, t) for d, t in zip(descriptions, types)]
+    if name == 'batch':
+        return categorize_batch(descriptions, types)
+    return categorize_batch(descriptions, types, model)
+
+
+def split(labeled, train_fraction, seed=0):
+    """Train and test rows, with each distinct description on one side only."""
+    descriptions = labeled['description'].unique()
+    order = np.random.default_rng(seed).permutation(len(descriptions))
+    train_descriptions = set(descriptions[order[:int(len(descriptions) * train_fraction)]])
+    in_train = labeled['description'].isin(train_descriptions)
+    return labeled[in_train], labeled[~in_train].reset_index(drop=True)
+
+
+def confusion(actual, predicted):
+    """Actual x predicted counts over every category that occurs in either."""
+    labels = [c for c in ALL_CATEGORIES if c in set(actual) | set(predicted)]
+    matrix = pd.crosstab(pd.Categorical(actual, labels), pd.Categorical(predicted, labels), dropna=False)
+    return matrix.rename_axis(index='actual', columns='predicted')
+
+
+def per_category(matrix):
+    """Precision, recall and support per category from a confusion matrix."""
+    hits = np.diag(matrix.to_numpy())
+    predicted = matrix.sum(axis=0).to_numpy()
+    support = matrix.sum(axis=1).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = pd.DataFrame({
+            'precision': np.where(predicted > 0, hits / predicted, np.nan),
+            'recall': np.where(support > 0, hits / support, np.nan),
+            'support': support,
+        }, index=matrix.index)
+    return scores[scores['support'] > 0]
+
+
+def evaluate(labeled, train_fraction, show_confusion):
+    train, test = split(labeled, train_fraction)
+    model = train_model(train)
+    summary = []
+    for name in CATEGORIZERS:
+        predicted = run_categorizer(name, list(test['description']), model)
+        matrix = confusion(test['category'], predicted)
+        accuracy = float(np.trace(matrix.to_numpy()) / len(test)) if len(test) else np.nan
+        scores = per_category(matrix)
+        summary.append({'categorizer': name, 'rows': len(test), 'accuracy': round(accuracy, 3),
+                        'macro_precision': round(scores['precision'].mean(), 3),
+                        'macro_recall': round(scores['recall'].mean(), 3)})
+        print(f"\n--- {name} ---")
+        print(scores.round(3).to_string())
+        if show_confusion:
+            print(matrix.to_string())
+    return pd.DataFrame(summary)
+
+
+def throughput(descriptions, model, repeats):
+    """Rows per second of each categorizer, best of `repeats`, and its speed relative to the keywords."""
+    results = []
+    run_categorizer('keywords', descriptions[:10])   # NLTK loads its data on first use
+    for name in CATEGORIZERS:
+        best = min(_timed(lambda: run_categorizer(name, descriptions, model)) for _ in range(repeats))
+        results.append({'categorizer': name, 'rows': len(descriptions), 'seconds': round(best, 3),
+                        'rows_per_s': round(len(descriptions) / best) if best else np.inf})
+    results = pd.DataFrame(results)
+    results['vs_keywords'] = (results['rows_per_s'] / results.at[0, 'rows_per_s']).round(2)
+    return results
+
+
+def _timed(action):
+    start = time.perf_counter()
+    action()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy and throughput of the expense categorizers.")
+    parser.add_argument("--dataset", default=str(DATASET_FILE), help="labeled CSV/Excel with an Expenses column")
+    parser.add_argument("--rows", type=int, default=20_000, help="rows in the synthetic set")
+    parser.add_argument("--train-fraction", type=float, default=0.5, help="share of each set the model learns from")
+    parser.add_argument("--repeats", type=int, default=3, help="timing runs per categorizer")
+    parser.add_argument("--confusion", action="store_true", help="print the full confusion matrices")
+    args = parser.parse_args()
+
+    sets = {'dataset': load_labeled(args.dataset), 'synthetic': synthetic_labeled(args.rows)}
+    summaries = []
+    for set_name, labeled in sets.items():
+        print(f"\n=== {set_name}: {len(labeled)} labeled rows ===")
+        summaries.append(evaluate(labeled, args.train_fraction, args.confusion).assign(set=set_name))
+
+    print("\n=== Accuracy ===")
+    print(pd.concat(summaries, ignore_index=True).to_string(index=False))
+
+    synthetic = sets['synthetic']
+    model = train_model(split(synthetic, args.train_fraction)[0])
+    print("\n=== Throughput (synthetic set) ===")
+    rates = throughput(list(synthetic['description']), model, args.repeats)
+    print(rates.to_string(index=False))
+    batch_speedup = rates.set_index('categorizer').at['batch', 'vs_keywords']
+    if batch_speedup < 1.1:
+        print(f"\nThe batch path runs at {batch_speedup:.2f}x the keyword rules: it adds accuracy, not throughput.")
+
+
+if __name__ == "__main__":
+    main()
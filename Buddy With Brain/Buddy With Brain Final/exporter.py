@@ -0,0 +1,192 @@
+import argparse
+import io
+import datetime
+import secrets
+import shutil
+import time
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from openpyxl import Workbook
+
+# --- Streaming ledger export ---
+# Reads the user's parquet file batch by batch with the date filter pushed
+# down to pyarrow, and writes each batch straight to the output. Only one
+# batch is in memory at a time, however long the history is.
+
+CHUNK_ROWS = 50_000
+EXPORT_COLUMNS = ['date', 'description', 'amount', 'Income/Expense', 'category', 'original_amount', 'currency']
+
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/octet-stream'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+def iter_ledger_batches(data_file, start=None, end=None, batch_size=CHUNK_ROWS):
+    """Yields record batches of the ledger between start and end (inclusive dates)."""
+    dataset = ds.dataset(str(data_file), format='parquet')
+    columns = [c for c in EXPORT_COLUMNS if c in dataset.schema.names]
+    date_filter = None
+    if start is not None:
+        date_filter = ds.field('date') >= pa.scalar(pd.Timestamp(start), type=dataset.schema.field('date').type)
+    if end is not None:
+        # end is a calendar day, so keep everything before the next midnight
+        end_cond = ds.field('date') < pa.scalar(pd.Timestamp(end) + pd.Timedelta(days=1), type=dataset.schema.field('date').type)
+        date_filter = end_cond if date_filter is None else date_filter & end_cond
+    for batch in dataset.to_batches(columns=columns, filter=date_filter, batch_size=batch_size):
+        if batch.num_rows:
+            yield batch
+
+
+def _write_csv(batches, out):
+    header = True
+    for batch in batches:
+        batch.to_pandas().to_csv(out, header=header, index=False, date_format='%Y-%m-%d %H:%M')
+        header = False
+    if header:
+        pd.DataFrame(columns=EXPORT_COLUMNS).to_csv(out, index=False)
+
+
+def _write_parquet(batches, out, schema):
+    with pq.ParquetWriter(out, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+
+
+def _write_excel(batches, out):
+    # write_only keeps openpyxl from holding every cell object in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Transactions")
+    header_written = False
+    for batch in batches:
+        if not header_written:
+            ws.append(batch.schema.names)
+            header_written = True
+        columns = [batch.column(i).to_pylist() for i in range(batch.num_columns)]
+        for row in zip(*columns):
+            ws.append(row)
+    if not header_written:
+        ws.append(EXPORT_COLUMNS)
+    wb.save(out)
+
+
+def export_ledger(data_file, out, fmt, start=None, end=None):
+    """
+    Streams the ledger in `data_file` to `out` (a path or binary file object)
+    as CSV, Parquet or Excel. Returns the number of rows written.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    rows = 0
+
+    def counted(batches):
+        nonlocal rows
+        for batch in batches:
+            rows += batch.num_rows
+            yield batch
+
+    batches = counted(iter_ledger_batches(data_file, start, end))
+    if fmt == 'CSV':
+        if isinstance(out, (str, Path)):
+            with open(out, 'w', newline='', encoding='utf-8') as f:
+                _write_csv(batches, f)
+        else:
+            # pandas writes text, so wrap binary streams
+            text = io.TextIOWrapper(out, encoding='utf-8', newline='', write_through=True)
+            _write_csv(batches, text)
+            text.detach()
+    elif fmt == 'Parquet':
+        schema = ds.dataset(str(data_file), format='parquet').schema
+        schema = pa.schema([schema.field(c) for c in EXPORT_COLUMNS if c in schema.names])
+        _write_parquet(batches, out, schema)
+    else:
+        _write_excel(batches, out)
+    return rows
+
+
+def export_file_name(username, fmt, start=None, end=None):
+    extension = EXPORT_FORMATS[fmt][0]
+    span = ""
+    if start is not None or end is not None:
+        span = f"_{start or 'start'}_to_{end or 'end'}"
+    return f"buddy_{username}{span}.{extension}"
+
+
+# --- Serving exports from the app ---
+# st.download_button holds the whole file in memory, so the app writes exports
+# into its static/ folder instead (server.enableStaticServing) and links to
+# them; the server sends the file from disk in chunks. Each export gets its own
+# unguessable folder and is removed after EXPORT_TTL_SECONDS. Streamlit's
+# static route refuses files over 200 MB, so larger exports are not linked.
+
+EXPORT_SUBDIR = "exports"
+EXPORT_TTL_SECONDS = 15 * 60
+MAX_STATIC_FILE_BYTES = 200 * 2**20
+
+
+def publish_export(static_dir, data_file, fmt, file_name, start=None, end=None):
+    """
+    Writes an export under `static_dir`/exports/<token>/ and returns
+    (folder, url, rows); the url is relative to the app's address. Raises
+    ValueError when the file is too large for the static route to serve.
+    """
+    remove_expired_exports(static_dir)
+    token = secrets.token_urlsafe(16)
+    folder = Path(static_dir) / EXPORT_SUBDIR / token
+    folder.mkdir(parents=True)
+    try:
+        rows = export_ledger(data_file, str(folder / file_name), fmt, start, end)
+        size = (folder / file_name).stat().st_size
+        if size > MAX_STATIC_FILE_BYTES:
+            raise ValueError(
+                f"The export is {size / 2**20:.0f} MB, over the {MAX_STATIC_FILE_BYTES // 2**20} MB the app can serve. "
+                f"Pick a shorter period or Parquet, or run exporter.py on the server."
+            )
+    except Exception:
+        remove_export(folder)
+        raise
+    return folder, f"./app/static/{EXPORT_SUBDIR}/{token}/{file_name}", rows
+
+
+def remove_export(folder):
+    shutil.rmtree(folder, ignore_errors=True)
+
+
+def remove_expired_exports(static_dir, ttl=EXPORT_TTL_SECONDS):
+    root = Path(static_dir) / EXPORT_SUBDIR
+    if not root.exists():
+        return
+    cutoff = time.time() - ttl
+    for folder in root.iterdir():
+        try:
+            if folder.stat().st_mtime < cutoff:
+                remove_export(folder)
+        except OSError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a user's ledger without loading it into memory.")
+    parser.add_argument("username")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default='CSV')
+    parser.add_argument("--start", type=datetime.date.fromisoformat, help="first day to include (YYYY-MM-DD)")
+    parser.add_argument("--end", type=datetime.date.fromisoformat, help="last day to include (YYYY-MM-DD)")
+    parser.add_argument("--data-dir", default="user_data")
+    parser.add_argument("-o", "--output", help="output file (default: named after the user and range)")
+    args = parser.parse_args()
+
+    data_file = Path(args.data_dir) / f"data_{args.username}.parquet"
+    if not data_file.exists():
+        parser.error(f"No data file for user '{args.username}' in {args.data_dir}")
+    output = args.output or export_file_name(args.username, args.format, args.start, args.end)
+    rows = export_ledger(data_file, output, args.format, args.start, args.end)
+    print(f"Exported {rows} rows to {output}")
+
+
+if __name__ == "__main__":
+    main()
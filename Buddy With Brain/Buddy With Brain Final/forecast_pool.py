@@ -0,0 +1,213 @@
+import multiprocessing
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from prophet.serialize import model_to_json
+from forecasting import MAX_FIT_WORKERS, fit_forecast, warm_start_params
+
+# --- Shared forecast pool ---
+# Prophet fits and backtests from every session in the process run on one
+# process pool sized to the machine, so a burst of forecasts queues instead of
+# starting a Stan process per click. Each user has at most MAX_JOBS_PER_USER
+# jobs running; waiting jobs are handed out round-robin across users, so one
+# user's backtest of every category doesn't hold up everyone else. A job whose
+# session stops polling (the user left or the page reran) is dropped from the
+# queue; one that is already running finishes and its result is discarded.
+# If a worker dies, the jobs on it fail and later ones get a fresh pool.
+
+MAX_JOBS_PER_USER = 2
+ABANDON_AFTER = 15.0   # seconds without a poll before a waiting job is dropped
+
+
+def fit_job(df_prophet, periods, init=None, max_train_days=None):
+    """A single-series fit in a worker; the model comes back as Prophet's JSON."""
+    m, forecast = fit_forecast(df_prophet, periods, init=init, max_train_days=max_train_days)
+    return model_to_json(m), forecast, warm_start_params(m)
+
+
+class ForecastJob:
+    def __init__(self, job_id, username, fn, args):
+        self.job_id = job_id
+        self.username = username
+        self.fn = fn
+        self.args = args
+        self.status = 'queued'   # queued -> running -> done / failed / cancelled
+        self.result = None
+        self.error = None
+        self.last_seen = time.time()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+
+class ForecastPool:
+    def __init__(self, max_workers=MAX_FIT_WORKERS, per_user=MAX_JOBS_PER_USER):
+        self.max_workers = max_workers
+        self.per_user = per_user
+        self._executor = self._new_executor()
+        self._waiting = {}         # username -> deque of queued jobs
+        self._turns = deque()      # usernames with waiting jobs, in round-robin order
+        self._running = {}         # username -> running job count
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def _new_executor(self):
+        # Spawned, so workers don't inherit the app's threads and open files
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def submit(self, username, fn, *args):
+        job = ForecastJob(uuid.uuid4().hex[:12], username, fn, args)
+        with self._lock:
+            if self._closed:
+                job.error = "The forecast pool has been shut down."
+                job.status = 'failed'
+                return job
+            if username not in self._waiting:
+                self._waiting[username] = deque()
+                self._turns.append(username)
+            self._waiting[username].append(job)
+            started = self._dispatch()
+        self._watch(started)
+        return job
+
+    def _dispatch(self):
+        """
+        Starts waiting jobs while there are free workers; called with the lock
+        held. Returns the (job, future) pairs it started, for _watch.
+        """
+        started_jobs = []
+        now = time.time()
+        while not self._closed and sum(self._running.values()) < self.max_workers and self._turns:
+            started = False
+            for _ in range(len(self._turns)):
+                username = self._turns[0]
+                self._turns.rotate(-1)
+                queue = self._waiting[username]
+                while queue and now - queue[0].last_seen > ABANDON_AFTER:
+                    queue.popleft().status = 'cancelled'
+                if queue and self._running.get(username, 0) < self.per_user:
+                    job = queue.popleft()
+                    future = self._start(job)
+                    if future is not None:
+                        started_jobs.append((job, future))
+                    started = True
+                if not queue:
+                    del self._waiting[username]
+                    self._turns.remove(username)
+                if started:
+                    break
+            if not started:
+                break
+        return started_jobs
+
+    def _watch(self, started_jobs):
+        # Called without the lock: a future that is already done runs its
+        # callback right here, and _finish takes the lock
+        for job, future in started_jobs:
+            future.add_done_callback(lambda f, job=job: self._finish(job, f))
+
+    def _start(self, job):
+        """Hands a job to the executor; returns its future, or None if it could not start."""
+        try:
+            future = self._executor.submit(job.fn, *job.args)
+        except BrokenProcessPool as e:
+            # A worker died; this job fails and the next ones start on a new pool
+            job.error = f"The forecast worker stopped unexpectedly ({e})"
+            job.status = 'failed'
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+            return None
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+            return None
+        job.status = 'running'
+        self._running[job.username] = self._running.get(job.username, 0) + 1
+        return future
+
+    def _finish(self, job, future):
+        with self._lock:
+            self._running[job.username] -= 1
+            if job.status != 'cancelled':
+                try:
+                    job.result = future.result()
+                    job.status = 'done'
+                except Exception as e:
+                    job.error = str(e)
+                    job.status = 'failed'
+            started = self._dispatch()
+        self._watch(started)
+
+    def position(self, job):
+        """
+        Jobs that will start before this one (0 once it is running), following
+        the round-robin order. Also counts as the job's session still waiting.
+        """
+        job.last_seen = time.time()
+        with self._lock:
+            if job.status != 'queued':
+                return 0
+            queues = [list(self._waiting[u]) for u in self._turns]
+            ahead = 0
+            for depth in range(max(len(q) for q in queues)):
+                for queue in queues:
+                    if depth < len(queue):
+                        if queue[depth] is job:
+                            return ahead
+                        ahead += 1
+            return ahead
+
+    def cancel(self, job):
+        """Drops a waiting job; a running one finishes in its worker but its result is discarded."""
+        with self._lock:
+            if job.finished:
+                return
+            if job.status == 'queued' and job.username in self._waiting:
+                queue = self._waiting[job.username]
+                if job in queue:
+                    queue.remove(job)
+                if not queue:
+                    del self._waiting[job.username]
+                    self._turns.remove(job.username)
+            job.status = 'cancelled'
+
+    def shutdown(self, wait=True):
+        """
+        Cancels every waiting job and stops the workers. With `wait`, returns
+        once the running jobs have finished and the worker processes exited.
+        """
+        with self._lock:
+            self._closed = True
+            for queue in self._waiting.values():
+                for job in queue:
+                    job.status = 'cancelled'
+            self._waiting.clear()
+            self._turns.clear()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def wait_for(pool, jobs, report=None, poll=0.5):
+    """
+    Waits for jobs, calling `report(queued_ahead, finished, total)` on every
+    poll. If the wait is interrupted (a rerun or the session closing), the
+    unfinished jobs are cancelled. Returns the jobs' results in order; raises
+    RuntimeError for the first failed job.
+    """
+    try:
+        while not all(job.finished for job in jobs):
+            waiting = [pool.position(job) for job in jobs if job.status == 'queued']
+            if report is not None:
+                report(min(waiting) if waiting else 0, sum(job.finished for job in jobs), len(jobs))
+            time.sleep(poll)
+    finally:
+        for job in jobs:
+            if not job.finished:
+                pool.cancel(job)
+    for job in jobs:
+        if job.status != 'done':
+            raise RuntimeError(job.error or "The forecast was cancelled.")
+    return [job.result for job in jobs]
@@ -0,0 +1,169 @@
+import argparse
+import datetime
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pandas as pd
+from forecasting import TOTAL, MIN_HISTORY_DAYS, MAX_FIT_WORKERS, daily_series, fit_forecast, projected_monthly_spend, warm_start_params
+
+# --- Off-peak forecast precompute ---
+# Once a night, fits a forecast for every goal category (and the total) of
+# every user who has goals, a few users at a time, and saves the projections
+# next to their ledger. The forecasting tab shows those straight away and
+# only fits on demand when the user asks for something else. Each night's fits
+# warm-start from the parameters saved by the night before.
+#
+#   python forecast_scheduler.py            # wait for the nightly window, forever
+#   python forecast_scheduler.py --once     # precompute now and exit
+
+DATA_DIR = Path("user_data")
+FORECAST_DAYS = 90
+OFF_PEAK_START, OFF_PEAK_END = 2, 5   # local hours
+STALE_AFTER = datetime.timedelta(days=1)
+
+
+def get_forecast_files(data_dir, username):
+    return data_dir / f"forecast_{username}.parquet", data_dir / f"forecast_{username}.json"
+
+
+def users_with_goals(data_dir):
+    users = []
+    for goals_file in sorted(data_dir.glob("goals_*.json")):
+        try:
+            with open(goals_file) as f:
+                goals = json.load(f)
+        except Exception:
+            continue
+        if goals:
+            users.append((goals_file.stem[len("goals_"):], goals))
+    return users
+
+
+def is_up_to_date(data_dir, username):
+    """True when the saved forecast is newer than the user's ledger and goals."""
+    frame_file, meta_file = get_forecast_files(data_dir, username)
+    if not (frame_file.exists() and meta_file.exists()):
+        return False
+    inputs = [data_dir / f"data_{username}.parquet", data_dir / f"goals_{username}.json"]
+    return all(meta_file.stat().st_mtime >= f.stat().st_mtime for f in inputs if f.exists())
+
+
+def precompute_user(data_dir, username, goals, periods=FORECAST_DAYS, max_train_days=None):
+    """Fits the user's goal categories and the total, and saves the projections. Returns categories fitted."""
+    data_file = data_dir / f"data_{username}.parquet"
+    if not data_file.exists():
+        return []
+    previous = load_precomputed(data_dir, username)
+    previous_params = previous[0].get('params', {}) if previous is not None else {}
+    df_expense = pd.read_parquet(data_file, columns=['date', 'amount', 'Income/Expense', 'category'],
+                                 filters=[('Income/Expense', '==', 'Expense')])
+    df_expense['date'] = pd.to_datetime(df_expense['date'])
+
+    frames, projections, params = [], {}, {}
+    for category in [TOTAL] + sorted({g['category'] for g in goals}):
+        df_prophet = daily_series(df_expense, category)
+        if len(df_prophet) < MIN_HISTORY_DAYS:
+            continue
+        m, forecast = fit_forecast(df_prophet, periods, init=previous_params.get(category), max_train_days=max_train_days)
+        projections[category] = float(projected_monthly_spend(forecast, periods))
+        params[category] = warm_start_params(m)
+        future = forecast.tail(periods)[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].assign(category=category)
+        frames.append(future)
+
+    frame_file, meta_file = get_forecast_files(data_dir, username)
+    if frames:
+        pd.concat(frames, ignore_index=True).to_parquet(frame_file, index=False)
+    # Written last, so its mtime marks when the projections were complete
+    with open(meta_file, 'w') as f:
+        json.dump({
+            'computed_at': datetime.datetime.now().isoformat(timespec='seconds'),
+            'data_mtime': data_file.stat().st_mtime,
+            'periods': periods,
+            'projections': projections,
+            'params': params,
+        }, f, indent=4)
+    return list(projections)
+
+
+def run_once(data_dir=DATA_DIR, periods=FORECAST_DAYS, max_workers=MAX_FIT_WORKERS, force=False,
+             max_train_days=None, log=print):
+    """Precomputes every user with goals whose forecast is out of date."""
+    pending = [(u, g) for u, g in users_with_goals(data_dir) if force or not is_up_to_date(data_dir, u)]
+    log(f"{len(pending)} user(s) to forecast")
+
+    def work(item):
+        username, goals = item
+        try:
+            log(f"{username}: {', '.join(precompute_user(data_dir, username, goals, periods, max_train_days)) or 'not enough data'}")
+        except Exception as e:
+            log(f"{username}: failed ({e})")
+
+    # Bounded, so a night with many users doesn't start every fit at once
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(work, pending))
+    return len(pending)
+
+
+def load_precomputed(data_dir, username):
+    """Returns (meta, forecast frame) of the last precompute, or None."""
+    frame_file, meta_file = get_forecast_files(data_dir, username)
+    if not meta_file.exists():
+        return None
+    with open(meta_file) as f:
+        meta = json.load(f)
+    frame = pd.read_parquet(frame_file) if frame_file.exists() else pd.DataFrame()
+    return meta, frame
+
+
+def staleness(meta, data_file, now=None):
+    """(age, reason it is stale or None) for a precomputed forecast."""
+    now = now or datetime.datetime.now()
+    age = now - datetime.datetime.fromisoformat(meta['computed_at'])
+    if data_file.exists() and data_file.stat().st_mtime > meta['data_mtime']:
+        return age, "transactions changed since"
+    if age > STALE_AFTER:
+        return age, "older than a day"
+    return age, None
+
+
+def next_window_start(now, start_hour=OFF_PEAK_START):
+    start = now.replace(hour=start_hour, minute=0, second=0, microsecond=0)
+    return start if start > now else start + datetime.timedelta(days=1)
+
+
+def run_scheduler(data_dir=DATA_DIR, start_hour=OFF_PEAK_START, end_hour=OFF_PEAK_END,
+                  max_workers=MAX_FIT_WORKERS, max_train_days=None, log=print):
+    """Runs run_once in each night's off-peak window, forever."""
+    while True:
+        now = datetime.datetime.now()
+        if not start_hour <= now.hour < end_hour:
+            wake = next_window_start(now, start_hour)
+            log(f"Sleeping until {wake:%Y-%m-%d %H:%M}")
+            time.sleep((wake - now).total_seconds())
+            continue
+        run_once(data_dir, max_workers=max_workers, max_train_days=max_train_days, log=log)
+        # Once per window
+        time.sleep((next_window_start(datetime.datetime.now(), start_hour) - datetime.datetime.now()).total_seconds())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute goal forecasts for all users off-peak.")
+    parser.add_argument("--once", action="store_true", help="run now instead of waiting for the window")
+    parser.add_argument("--force", action="store_true", help="refit users whose forecast is up to date")
+    parser.add_argument("--data-dir", default=str(DATA_DIR))
+    parser.add_argument("--workers", type=int, default=MAX_FIT_WORKERS, help="users fitted at the same time")
+    parser.add_argument("--max-train-days", type=int, help="fit on only this many recent days")
+    parser.add_argument("--window", default=f"{OFF_PEAK_START}-{OFF_PEAK_END}", help="off-peak hours, e.g. 2-5")
+    args = parser.parse_args()
+
+    data_dir = Path(args.data_dir)
+    if args.once:
+        run_once(data_dir, max_workers=args.workers, force=args.force, max_train_days=args.max_train_days)
+    else:
+        start_hour, end_hour = (int(h) for h in args.window.split("-"))
+        run_scheduler(data_dir, start_hour, end_hour, args.workers, args.max_train_days)
+
+
+if __name__ == "__main__":
+    main()
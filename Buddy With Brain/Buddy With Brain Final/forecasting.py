@@ -0,0 +1,128 @@
+import os
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+
+# --- Expense forecasting ---
+# Prophet fits for a single series, plus a hierarchical mode where every
+# category is fitted once (fit_node, one job per node on the app's forecast
+# pool) and the forecasts are reconciled so the categories add up to the total. A refit of a series that was fitted
+# before can start from the old fit's parameters: a few new days barely move
+# them, so the optimizer has little left to do.
+
+TOTAL = 'All Expenses'
+DAYS_PER_MONTH = 30.44
+MIN_HISTORY_DAYS = 7
+MAX_FIT_WORKERS = max(1, min(8, os.cpu_count() or 1))
+
+
+def daily_series(df_expense, category=None):
+    """Daily expense totals in Prophet's ds/y layout."""
+    if category is not None and category != TOTAL:
+        df_expense = df_expense[df_expense['category'] == category]
+    df_prophet = df_expense.set_index('date').resample('D')['amount'].sum().reset_index()
+    df_prophet.columns = ['ds', 'y']
+    return df_prophet
+
+
+def warm_start_params(m):
+    """A fitted model's parameters as init values for the next fit of the same series (JSON-friendly)."""
+    return {
+        name: float(m.params[name][0][0]) if name in ('k', 'm', 'sigma_obs') else m.params[name][0].tolist()
+        for name in ('k', 'm', 'sigma_obs', 'delta', 'beta')
+    }
+
+
+def fit_forecast(df_prophet, periods, init=None, max_train_days=None):
+    """
+    Fits Prophet on a ds/y frame and predicts `periods` days ahead (history
+    included). `init` warm-starts the fit from warm_start_params of an earlier
+    fit; Prophet falls back to its own start for any parameter whose shape no
+    longer fits. `max_train_days` fits on only the most recent days.
+    """
+    if max_train_days is not None:
+        df_prophet = df_prophet.tail(max_train_days)
+    m = Prophet()
+    if init is None:
+        m.fit(df_prophet)
+    else:
+        m.fit(df_prophet, init={name: np.asarray(value) for name, value in init.items()})
+    future = m.make_future_dataframe(periods=periods)
+    return m, m.predict(future)
+
+
+def projected_monthly_spend(forecast, periods):
+    """Average forecast daily spend over the horizon, scaled to a month."""
+    return forecast.set_index('ds').tail(periods)['yhat'].mean() * DAYS_PER_MONTH
+
+
+def fit_node(series, periods):
+    """One hierarchy node's fitted and future yhat; picklable, so it can run in a worker process."""
+    # Prophet needs some non-zero history; a silent category forecasts zero
+    if (series['y'] != 0).sum() < 2:
+        dates = pd.date_range(series['ds'].min(), periods=len(series) + periods, freq='D')
+        return pd.DataFrame({'ds': dates, 'yhat': 0.0})
+    _, forecast = fit_forecast(series, periods)
+    return forecast[['ds', 'yhat']]
+
+
+def summing_matrix(n_bottom):
+    """S for a two-level hierarchy: the total row, then one row per category."""
+    return np.vstack([np.ones((1, n_bottom)), np.eye(n_bottom)])
+
+
+def reconcile(base, residual_var=None, method='mint'):
+    """
+    Reconciles base forecasts (nodes x horizon, total first) so the categories
+    sum to the total. 'bottom_up' keeps the category forecasts; 'mint' is
+    MinT with a diagonal covariance (WLS on in-sample residual variances).
+    """
+    n_bottom = base.shape[0] - 1
+    S = summing_matrix(n_bottom)
+    if method == 'bottom_up':
+        bottom = base[1:]
+    else:
+        w_inv = 1.0 / np.maximum(residual_var, 1e-9)
+        StW = S.T * w_inv
+        P = np.linalg.solve(StW @ S, StW)
+        bottom = P @ base
+    return S @ bottom
+
+
+def hierarchy_series(df_expense, method='mint'):
+    """
+    The daily history as a wide frame (total first, then one column per
+    category) and the ds/y series of each node that gets its own fit.
+    """
+    categories = sorted(df_expense['category'].unique())
+    wide = df_expense.pivot_table(index=pd.to_datetime(df_expense['date']).dt.normalize(),
+                                  columns='category', values='amount', aggfunc='sum')
+    wide = wide.reindex(columns=categories)
+    wide = wide.reindex(pd.date_range(wide.index.min(), wide.index.max(), freq='D')).fillna(0.0)
+    wide.insert(0, TOTAL, wide.sum(axis=1))
+
+    nodes = list(wide.columns) if method != 'bottom_up' else categories
+    return wide, {node: pd.DataFrame({'ds': wide.index, 'y': wide[node].to_numpy()}) for node in nodes}
+
+
+def reconcile_fits(wide, fits, method='mint'):
+    """
+    Reconciles the fit_node results (node -> frame) for the history in `wide`.
+    Returns a frame indexed by date with the total first and one column per
+    category, and a flag column `is_forecast` for the future dates.
+    """
+    dates = next(iter(fits.values()))['ds']
+    base = np.vstack([
+        fits[node]['yhat'].to_numpy() if node in fits else np.zeros(len(dates))
+        for node in wide.columns
+    ])
+    history_len = len(wide)
+    residual_var = None
+    if method != 'bottom_up':
+        residual_var = (wide.to_numpy().T - base[:, :history_len]).var(axis=1)
+
+    reconciled = reconcile(base, residual_var, method)
+    result = pd.DataFrame(reconciled.T, index=pd.DatetimeIndex(dates, name='ds'), columns=wide.columns)
+    result['is_forecast'] = np.arange(len(result)) >= history_len
+    return result
+
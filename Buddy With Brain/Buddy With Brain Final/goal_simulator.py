@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+# --- What-if simulation for goals ---
+# Instead of one projected month-end figure, thousands of possible rests of the
+# month are drawn at once: either whole past days resampled from recent history
+# (so categories that tend to move together still do) or daily draws from the
+# overnight forecast's uncertainty band. Every goal is scored on the same
+# paths, as array operations over a paths x categories matrix, and a cut only
+# rescales those paths, so the difference it makes isn't drawing noise.
+
+N_PATHS = 10_000
+LOOKBACK_DAYS = 90
+PROPHET_INTERVAL_Z = 1.2816   # Prophet's default 80% interval is yhat ± 1.28 sigma
+
+
+def daily_history(df_expense, lookback_days=LOOKBACK_DAYS):
+    """Days x categories frame of daily spend over the last `lookback_days` of the ledger."""
+    dates = pd.to_datetime(df_expense['date']).dt.normalize()
+    if dates.empty:
+        return pd.DataFrame()
+    end = dates.max()
+    start = end - pd.Timedelta(days=lookback_days - 1)
+    recent = df_expense[dates >= start]
+    wide = recent.pivot_table(index=dates[dates >= start], columns='category', values='amount', aggfunc='sum')
+    return wide.reindex(pd.date_range(start, end, freq='D')).fillna(0.0)
+
+
+def days_left_in_month(today=None):
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+    return today.days_in_month - today.day
+
+
+def bootstrap_paths(history, categories, days, n_paths=N_PATHS, seed=0):
+    """Paths x categories spend over the next `days` days, from whole past days drawn with replacement."""
+    matrix = history.reindex(columns=categories, fill_value=0.0).to_numpy()
+    if days == 0 or len(matrix) == 0:
+        return np.zeros((n_paths, len(categories)))
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(matrix), size=(n_paths, days))
+    return matrix[picks].sum(axis=1)
+
+
+def forecast_paths(forecast_frame, categories, days, n_paths=N_PATHS, seed=0, today=None):
+    """
+    Paths x categories spend over the next `days` days from a forecast frame
+    (ds, yhat, yhat_lower, yhat_upper, category), with independent normal days.
+    None when the forecast doesn't cover every category for those days.
+    """
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+    window = forecast_frame[(forecast_frame['ds'] > today) & (forecast_frame['ds'] <= today + pd.Timedelta(days=days))]
+    counts = window.groupby('category').size().reindex(categories, fill_value=0)
+    if (counts < days).any():
+        return None
+    sigma = (window['yhat_upper'] - window['yhat_lower']) / (2 * PROPHET_INTERVAL_Z)
+    by_category = window.assign(var=sigma ** 2).groupby('category')[['yhat', 'var']].sum().reindex(categories)
+    rng = np.random.default_rng(seed)
+    # A sum of normal days is normal; spending can't go negative
+    draws = rng.standard_normal((n_paths, len(categories)))
+    return np.maximum(by_category['yhat'].to_numpy() + draws * np.sqrt(by_category['var'].to_numpy()), 0.0)
+
+
+def simulate_goals(progress, future, cuts=None):
+    """
+    Scores every goal on simulated month ends. `progress` is goal_progress's
+    frame, `future` the paths x goals spend still to come (same order) and
+    `cuts` maps categories to the fraction cut from their future spend.
+    """
+    goals = progress['goal'].to_numpy(dtype=float)
+    month_end = progress['spent'].to_numpy(dtype=float) + future
+    scale = 1.0 - progress['category'].map(cuts or {}).fillna(0.0).to_numpy(dtype=float)
+    month_end_cut = progress['spent'].to_numpy(dtype=float) + future * scale
+
+    return pd.DataFrame({
+        'category': progress['category'].to_numpy(),
+        'goal': goals,
+        'spent': progress['spent'].to_numpy(dtype=float),
+        'p_under': (month_end <= goals).mean(axis=0),
+        'p_under_cut': (month_end_cut <= goals).mean(axis=0),
+        # The month-end spread is the forecast as is; the cuts only show in p_under_cut
+        'median': np.median(month_end, axis=0),
+        'p90': np.percentile(month_end, 90, axis=0),
+    })
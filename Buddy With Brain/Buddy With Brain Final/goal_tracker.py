@@ -0,0 +1,65 @@
+import pandas as pd
+
+# --- Goal progress without a forecast ---
+# Expense totals are kept per (month, category) and updated with each insert,
+# so month-to-date numbers for every goal come from a small lookup instead of
+# regrouping the whole ledger.
+
+
+def build_month_totals(df):
+    """Expense totals indexed by (month, category) for the whole ledger."""
+    expenses = df[df['Income/Expense'] == 'Expense']
+    if expenses.empty:
+        return pd.Series(dtype=float, index=pd.MultiIndex.from_arrays([[], []], names=['month', 'category']))
+    months = pd.to_datetime(expenses['date']).dt.to_period('M')
+    totals = pd.to_numeric(expenses['amount']).groupby([months.rename('month'), expenses['category']]).sum()
+    return totals.rename_axis(['month', 'category'])
+
+
+def update_month_totals(totals, new_rows):
+    """Adds only the new rows to the running totals."""
+    delta = build_month_totals(new_rows)
+    if delta.empty:
+        return totals
+    if totals.empty:
+        return delta
+    return totals.add(delta, fill_value=0)
+
+
+def goal_progress(totals, goals, today=None):
+    """
+    Month-to-date spend, burn rate and projected month-end spend for all goals.
+    Returns one row per goal, in the order of the goals list.
+    """
+    columns = ['category', 'goal', 'spent', 'remaining', 'pct_used',
+               'burn_rate', 'projected', 'over_budget', 'projected_over']
+    if not goals:
+        return pd.DataFrame(columns=columns)
+
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+    month = today.to_period('M')
+    days_elapsed = today.day
+    days_in_month = today.days_in_month
+
+    progress = pd.DataFrame(goals).rename(columns={'amount': 'goal'})
+    if not totals.empty and month in totals.index.get_level_values('month'):
+        month_totals = totals.xs(month, level='month')
+    else:
+        month_totals = pd.Series(dtype=float)
+    progress['spent'] = month_totals.reindex(progress['category']).fillna(0).to_numpy()
+
+    progress['remaining'] = progress['goal'] - progress['spent']
+    progress['pct_used'] = progress['spent'] / progress['goal'] * 100
+    progress['burn_rate'] = progress['spent'] / days_elapsed
+    progress['projected'] = progress['burn_rate'] * days_in_month
+    progress['over_budget'] = progress['spent'] > progress['goal']
+    progress['projected_over'] = progress['projected'] > progress['goal']
+    return progress[columns]
+
+
+def new_breaches(before, after):
+    """Goals that are over budget in `after` but were not in `before`."""
+    if after.empty:
+        return after
+    was_over = after['category'].map(before.set_index('category')['over_budget']).fillna(False).astype(bool)
+    return after[after['over_budget'] & ~was_over]
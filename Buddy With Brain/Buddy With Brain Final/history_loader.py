@@ -0,0 +1,69 @@
+import threading
+import pandas as pd
+import pyarrow.parquet as pq
+
+# --- Progressive history loading ---
+# At login only the last few months of the ledger are read, so the dashboard
+# can draw straight away. The older rows are read in a background thread and
+# added to the session once they are in. The ledger file is sorted by date with
+# per-row-group statistics, so both reads only touch the row groups they need.
+
+RECENT_MONTHS = 3
+
+
+def ledger_date_range(data_file):
+    """(first, last) date of a ledger from its row-group statistics, without reading rows."""
+    metadata = pq.ParquetFile(data_file).metadata
+    if metadata.num_rows == 0:
+        return None
+    date_col = metadata.schema.to_arrow_schema().get_field_index('date')
+    lows, highs = [], []
+    for i in range(metadata.num_row_groups):
+        stats = metadata.row_group(i).column(date_col).statistics
+        if stats is None or not stats.has_min_max:
+            return None
+        lows.append(stats.min)
+        highs.append(stats.max)
+    return pd.Timestamp(min(lows)), pd.Timestamp(max(highs))
+
+
+def recent_start(data_file, months=RECENT_MONTHS):
+    """
+    Where the recent part of the ledger starts: `months` before its latest
+    date. None when the whole ledger is recent or the file has no statistics.
+    """
+    date_range = ledger_date_range(data_file)
+    if date_range is None:
+        return None
+    first, last = date_range
+    start = last.normalize() - pd.DateOffset(months=months)
+    return start if start > first else None
+
+
+class HistoryBackfill:
+    """
+    Reads the rows before `before` in a daemon thread. Rows without a date are
+    not among them; they sort last and come with the recent read.
+    """
+
+    def __init__(self, data_file, before):
+        self.before = before
+        self.result = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, args=(data_file,), name="history-backfill", daemon=True)
+        self._thread.start()
+
+    def _run(self, data_file):
+        try:
+            df = pd.read_parquet(data_file, filters=[('date', '<', self.before)])
+            df['date'] = pd.to_datetime(df['date'])
+            self.result = df
+        except Exception as e:
+            self.error = str(e)
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
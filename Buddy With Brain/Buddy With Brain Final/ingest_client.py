@@ -0,0 +1,65 @@
+import argparse
+import base64
+import json
+import random
+import urllib.error
+import urllib.request
+import pandas as pd
+
+# --- Ingestion test client ---
+# Pushes transactions to ingest_server.py the way a bank-feed exporter would:
+# either a JSON file of transactions or a few generated sample ones.
+#
+#   python ingest_client.py --user sru_321 --password ... --sample 20
+#   python ingest_client.py --user sru_321 --password ... --file feed.json
+
+SAMPLE_DESCRIPTIONS = ["UPI/SWIGGY/ORDER", "POS UBER TRIP", "AMAZON PAY", "BESCOM ELECTRICITY", "NETFLIX.COM"]
+
+
+def sample_transactions(n, seed=0):
+    rng = random.Random(seed)
+    today = pd.Timestamp.today().normalize()
+    return [{
+        'date': (today - pd.Timedelta(days=rng.randint(0, 6))).strftime('%Y-%m-%d'),
+        'description': rng.choice(SAMPLE_DESCRIPTIONS),
+        'amount': round(rng.uniform(50, 2_000), 2),
+        'type': 'Expense',
+    } for _ in range(n)]
+
+
+def push(url, username, password, transactions):
+    """POSTs one batch; returns (HTTP status, response body)."""
+    token = base64.b64encode(f"{username}:{password}".encode()).decode()
+    request = urllib.request.Request(
+        url, data=json.dumps(transactions).encode(), method="POST",
+        headers={"Content-Type": "application/json", "Authorization": f"Basic {token}"},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        return e.code, json.loads(body) if body else {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Push transactions to the local ingestion service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8502/transactions")
+    parser.add_argument("--user", required=True)
+    parser.add_argument("--password", required=True)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--file", help="JSON file with a transaction or a list of them")
+    source.add_argument("--sample", type=int, help="push this many generated transactions")
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file) as f:
+            transactions = json.load(f)
+    else:
+        transactions = sample_transactions(args.sample)
+    status, body = push(args.url, args.user, args.password, transactions)
+    print(status, body)
+
+
+if __name__ == "__main__":
+    main()
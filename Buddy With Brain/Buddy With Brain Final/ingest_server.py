@@ -0,0 +1,249 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import math
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import pandas as pd
+import streamlit_authenticator as stauth
+from user_store import UserStore
+from learned_categorizer import categorize_batch, load_model
+from currency import BASE_CURRENCY, load_rates, available_currencies, to_inr
+from data_versions import bump_version, ledger_lock
+from goal_tracker import build_month_totals
+from benchmarks import build_user_sketch, save_sketch
+
+# --- Transaction ingestion service ---
+# A small local HTTP service for SMS/UPI parsers and bank-feed exporters:
+#
+#   POST /transactions   (HTTP Basic auth with the user's app login)
+#   [{"date": "2024-05-01", "description": "SWIGGY ORDER", "amount": 250,
+#     "type": "Expense", "currency": "INR"}, ...]
+#
+# Requests are only validated and queued. A flusher thread picks up each
+# user's queue every few seconds, categorizes and converts it as one batch and
+# appends it to the ledger in a single write, then bumps the user's ledger
+# version; open app sessions reload just the dates the batch touched. The
+# user's benchmark sketch is rebuilt from the new ledger at the same time. The
+# write holds the same ledger lock as the app's saves, and a batch that fails
+# to write goes back in the queue for the next flush.
+#
+#   python ingest_server.py --port 8502
+
+DATA_DIR = Path("user_data")
+ROW_GROUP_ROWS = 8_192     # same layout as the app's saves
+FLUSH_SECONDS = 3.0
+MAX_BODY_BYTES = 5 * 2**20
+TYPES = ('Income', 'Expense')
+
+
+class IngestBuffer:
+    """Validated rows waiting to be written, per user."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def add(self, username, rows):
+        with self._lock:
+            self._pending.setdefault(username, []).extend(rows)
+            return len(self._pending[username])
+
+    def take_all(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        return pending
+
+    def put_back(self, username, rows):
+        """Requeues rows that could not be written, ahead of anything queued since."""
+        with self._lock:
+            self._pending[username] = rows + self._pending.get(username, [])
+
+
+def parse_transactions(payload, currencies):
+    """Checks a request body and returns its rows; raises ValueError naming the first bad row."""
+    items = payload if isinstance(payload, list) else [payload]
+    if not items:
+        raise ValueError("No transactions in the request")
+    rows = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"Row {i}: expected an object")
+        try:
+            date = pd.Timestamp(item['date'])
+            amount = float(item['amount'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Row {i}: needs a valid date and amount ({e})")
+        if pd.isna(date):
+            raise ValueError(f"Row {i}: needs a valid date and amount (no date)")
+        if not math.isfinite(amount):
+            raise ValueError(f"Row {i}: amount must be a finite number")
+        if date.tzinfo is not None:
+            # Ledger dates are naive local time
+            date = pd.Timestamp(date.to_pydatetime().astimezone().replace(tzinfo=None))
+        description = str(item.get('description', '')).strip()
+        kind = item.get('type', 'Expense')
+        currency = str(item.get('currency', BASE_CURRENCY)).strip().upper()
+        if not description:
+            raise ValueError(f"Row {i}: description is empty")
+        if kind not in TYPES:
+            raise ValueError(f"Row {i}: type must be Income or Expense")
+        if currency not in currencies:
+            raise ValueError(f"Row {i}: no exchange rates for {currency}")
+        rows.append({'date': date, 'description': description, 'amount': abs(amount),
+                     'Income/Expense': kind, 'currency': currency, 'original_amount': abs(amount)})
+    return rows
+
+
+def append_to_ledger(data_dir, username, rows):
+    """Categorizes and converts a user's queued rows as one batch and appends them. Returns the rows written."""
+    new_rows = pd.DataFrame(rows)
+    new_rows['category'] = categorize_batch(new_rows['description'], new_rows['Income/Expense'],
+                                            load_model(data_dir / f"model_{username}.npz"))
+    new_rows = to_inr(new_rows, load_rates(data_dir / "exchange_rates.csv"))
+
+    data_file = data_dir / f"data_{username}.parquet"
+    with ledger_lock(data_dir, username):
+        ledger = pd.read_parquet(data_file) if data_file.exists() else pd.DataFrame(columns=new_rows.columns)
+        ledger = pd.concat([ledger, new_rows], ignore_index=True)
+        ledger['date'] = pd.to_datetime(ledger['date'])
+        # Ledgers from before multi-currency support are all in rupees
+        ledger['currency'] = ledger['currency'].fillna(BASE_CURRENCY)
+        ledger['original_amount'] = ledger['original_amount'].fillna(ledger['amount'])
+        # Saved before the ledger is replaced: if it fails, the batch is retried and
+        # the sketch rebuilt, rather than the rows written twice
+        save_sketch(data_dir / f"sketch_{username}.json", build_user_sketch(build_month_totals(ledger)))
+        tmp_file = data_file.with_suffix(".tmp")
+        ledger.sort_values('date', kind='mergesort').to_parquet(tmp_file, index=False, row_group_size=ROW_GROUP_ROWS)
+        os.replace(tmp_file, data_file)
+        bump_version(data_dir, username, 'ledger', changed_from=new_rows['date'].min())
+    return new_rows
+
+
+def run_flusher(buffer, data_dir, stop, interval=FLUSH_SECONDS, log=print):
+    """
+    Writes everything queued every `interval` seconds until `stop` is set, then
+    once more. A batch that fails is requeued and retried on the next flush.
+    """
+    while True:
+        stopping = stop.wait(interval)
+        for username, rows in buffer.take_all().items():
+            try:
+                written = append_to_ledger(data_dir, username, rows)
+                log(f"{username}: wrote {len(written)} row(s)")
+            except Exception as e:
+                buffer.put_back(username, rows)
+                log(f"{username}: could not write {len(rows)} row(s){'' if stopping else ', will retry'} ({e})")
+        if stopping:
+            return
+
+
+class Authenticator:
+    """HTTP Basic auth against the user store; bcrypt runs once per user and password."""
+
+    def __init__(self, store):
+        self.store = store
+        self._verified = {}
+        self._lock = threading.Lock()
+
+    def check(self, header):
+        if not header or not header.startswith("Basic "):
+            return None
+        try:
+            username, _, password = base64.b64decode(header[6:]).decode().partition(":")
+        except Exception:
+            return None
+        user = self.store.get(username)
+        if user is None:
+            return None
+        # Feeds post often; remember a digest of a checked password until the stored hash changes
+        digest = hashlib.sha256(f"{user['password']}:{password}".encode()).digest()
+        with self._lock:
+            known = self._verified.get(username)
+        if known is not None and hmac.compare_digest(known, digest):
+            return username
+        if not stauth.Hasher.check_pw(password, user['password']):
+            return None
+        with self._lock:
+            self._verified[username] = digest
+        return username
+
+
+def make_handler(buffer, authenticator, data_dir):
+    class IngestHandler(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/transactions":
+                return self._reply(404, {'error': "Not found"})
+            username = authenticator.check(self.headers.get("Authorization"))
+            if username is None:
+                self.send_response(401)
+                self.send_header("WWW-Authenticate", 'Basic realm="Buddy With Brain"')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_BYTES:
+                return self._reply(413, {'error': "Request body too large"})
+            try:
+                payload = json.loads(self.rfile.read(length) or b"null")
+                rows = parse_transactions(payload, available_currencies(load_rates(data_dir / "exchange_rates.csv")))
+            except ValueError as e:
+                return self._reply(400, {'error': str(e)})
+            queued = buffer.add(username, rows)
+            self._reply(202, {'accepted': len(rows), 'queued': queued})
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/health":
+                return self._reply(200, {'status': "ok"})
+            self._reply(404, {'error': "Not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return IngestHandler
+
+
+def serve(host, port, data_dir=DATA_DIR, interval=FLUSH_SECONDS):
+    buffer = IngestBuffer()
+    authenticator = Authenticator(UserStore(data_dir / "users.db"))
+    stop = threading.Event()
+    flusher = threading.Thread(target=run_flusher, args=(buffer, data_dir, stop, interval),
+                               name="ingest-flusher", daemon=True)
+    flusher.start()
+    server = ThreadingHTTPServer((host, port), make_handler(buffer, authenticator, data_dir))
+    print(f"Accepting transactions on http://{host}:{port}/transactions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        # Write whatever is still queued before exiting
+        stop.set()
+        flusher.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP service that appends pushed transactions to users' ledgers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--data-dir", default=str(DATA_DIR))
+    parser.add_argument("--flush-seconds", type=float, default=FLUSH_SECONDS, help="how often queued rows are written")
+    args = parser.parse_args()
+    serve(args.host, args.port, Path(args.data_dir), args.flush_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import re
+import zlib
+import numpy as np
+import pandas as pd
+from categorynltk import ALL_CATEGORIES, STOP_WORDS, categorize_expense
+from merchant_matcher import match_merchants
+
+# --- Learned second stage for the keyword categorizer ---
+# A multinomial naive Bayes over hashed word tokens. Each correction made in the
+# data editor adds its tokens to the counts of the chosen category, so learning
+# is O(tokens) and the model never needs a full retrain.
+
+N_FEATURES = 2 ** 14
+ALPHA = 1.0
+MIN_CONFIDENCE = 0.5      # needed to replace an 'Other' from the keyword pass
+OVERRIDE_CONFIDENCE = 0.9 # needed to overrule a keyword match
+
+# Income is decided by the transaction type, never by the description.
+MODEL_CATEGORIES = [cat for cat in ALL_CATEGORIES if cat != 'Income']
+
+TOKEN_PATTERN = re.compile(r"[a-z]+")
+
+
+def tokenize(description):
+    """Lowercase word tokens without stopwords, same spirit as categorize_expense."""
+    return [t for t in TOKEN_PATTERN.findall(str(description).lower())
+            if t not in STOP_WORDS and len(t) > 1]
+
+
+def hash_token(token):
+    # crc32 instead of hash() so buckets are stable across processes
+    return zlib.crc32(token.encode('utf-8')) % N_FEATURES
+
+
+class CategoryModel:
+    def __init__(self, feature_counts=None, class_counts=None):
+        n_classes = len(MODEL_CATEGORIES)
+        self.feature_counts = feature_counts if feature_counts is not None else np.zeros((n_classes, N_FEATURES))
+        self.class_counts = class_counts if class_counts is not None else np.zeros(n_classes)
+
+    def copy(self):
+        return CategoryModel(self.feature_counts.copy(), self.class_counts.copy())
+
+    @property
+    def n_corrections(self):
+        return int(self.class_counts.sum())
+
+    def learn(self, description, category):
+        """Adds one user correction to the model."""
+        if category not in MODEL_CATEGORIES:
+            return
+        idx = MODEL_CATEGORIES.index(category)
+        hashes = [hash_token(t) for t in tokenize(description)]
+        if not hashes:
+            return
+        np.add.at(self.feature_counts[idx], hashes, 1)
+        self.class_counts[idx] += 1
+
+    def predict(self, descriptions):
+        """
+        Returns (categories, confidence) arrays for a batch of descriptions.
+        Rows with no token the model has seen get category None.
+        """
+        descriptions = list(descriptions)
+        n_rows = len(descriptions)
+        categories = np.full(n_rows, None, dtype=object)
+        confidence = np.zeros(n_rows)
+        if n_rows == 0 or self.n_corrections == 0:
+            return categories, confidence
+
+        row_hashes = [[hash_token(t) for t in tokenize(d)] for d in descriptions]
+        lengths = np.fromiter((len(h) for h in row_hashes), dtype=np.int64, count=n_rows)
+        flat = np.fromiter((h for hs in row_hashes for h in hs), dtype=np.int64, count=lengths.sum())
+        if flat.size == 0:
+            return categories, confidence
+
+        log_prior = np.log(self.class_counts + ALPHA) - np.log(self.class_counts.sum() + ALPHA * len(self.class_counts))
+        totals = self.feature_counts.sum(axis=1, keepdims=True)
+        log_lik = np.log(self.feature_counts + ALPHA) - np.log(totals + ALPHA * N_FEATURES)
+
+        # Sum the token log-likelihoods of each row in one pass over all rows
+        has_tokens = lengths > 0
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))[has_tokens]
+        scores = np.add.reduceat(log_lik[:, flat], starts, axis=1) + log_prior[:, None]
+
+        scores -= scores.max(axis=0)
+        probs = np.exp(scores)
+        probs /= probs.sum(axis=0)
+
+        # Only trust rows where at least one token was seen in a correction
+        seen = (self.feature_counts.sum(axis=0)[flat] > 0).astype(np.int64)
+        known = np.add.reduceat(seen, starts) > 0
+
+        best = probs.argmax(axis=0)
+        rows = np.flatnonzero(has_tokens)[known]
+        categories[rows] = np.array(MODEL_CATEGORIES, dtype=object)[best[known]]
+        confidence[rows] = probs.max(axis=0)[known]
+        return categories, confidence
+
+
+def load_model(model_file):
+    """Loads a saved model, or returns an empty one."""
+    if model_file.exists():
+        try:
+            with np.load(model_file, allow_pickle=False) as data:
+                saved = list(data['categories'])
+                model = CategoryModel()
+                # Map saved rows by name so adding a category doesn't break old models
+                for i, cat in enumerate(saved):
+                    if cat in MODEL_CATEGORIES and data['feature_counts'].shape[1] == N_FEATURES:
+                        j = MODEL_CATEGORIES.index(cat)
+                        model.feature_counts[j] = data['feature_counts'][i]
+                        model.class_counts[j] = data['class_counts'][i]
+                return model
+        except Exception:
+            pass
+    return CategoryModel()
+
+
+def save_model(model_file, model):
+    np.savez_compressed(
+        model_file,
+        categories=np.array(MODEL_CATEGORIES),
+        feature_counts=model.feature_counts,
+        class_counts=model.class_counts,
+    )
+
+
+def categorize_batch(descriptions, income_expense_types, model=None):
+    """
+    Categorizes a whole upload: the keyword rules first, fuzzy merchant
+    matching on the rows they left as 'Other', then the learned model on what
+    is still 'Other' (or on anything it is confident was got wrong).
+    """
+    descriptions = np.asarray(list(descriptions), dtype=object)
+    types = np.asarray(list(income_expense_types), dtype=object)
+    result = np.array(
+        [categorize_expense(d, t) for d, t in zip(descriptions, types)],
+        dtype=object
+    )
+    misses = np.flatnonzero((result == 'Other') & (types != 'Income'))
+    if misses.size:
+        fuzzy, _ = match_merchants(descriptions[misses])
+        found = pd.notna(fuzzy)
+        result[misses[found]] = fuzzy[found]
+    if model is None or model.n_corrections == 0:
+        return result.tolist()
+
+    expense_rows = np.flatnonzero(types != 'Income')
+    if expense_rows.size == 0:
+        return result.tolist()
+
+    predicted, confidence = model.predict(descriptions[expense_rows])
+    keyword_cat = result[expense_rows]
+    use = pd.notna(predicted) & (
+        ((keyword_cat == 'Other') & (confidence >= MIN_CONFIDENCE)) |
+        (confidence >= OVERRIDE_CONFIDENCE)
+    )
+    result[expense_rows[use]] = predicted[use]
+    return result.tolist()
@@ -0,0 +1,228 @@
+import argparse
+import os
+import shutil
+import tempfile
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import streamlit as st
+import streamlit_authenticator as stauth
+from streamlit.testing.v1 import AppTest
+from user_store import UserStore
+from upload_jobs import parse_upload
+from bank_profiles import BUILTIN_PROFILES
+
+# --- Load test ---
+# Drives the real app.py headlessly with Streamlit's AppTest: N simulated
+# users log in and go through the dashboard, a filter, a manual entry, a goal
+# and (optionally) a forecast, all at once against generated ledgers.
+# AppTest can't drive file uploaders or the data editor, so the upload
+# step times parse_upload on a generated statement in the same user process.
+#
+# Limitation: AppTest swaps a process-wide runtime on every run, so two
+# sessions can't run in one process (on threads they break each other's runs).
+# Each simulated user therefore gets its own worker process. The numbers show
+# contention for the machine's CPU, disk and the shared user_data/ files, not
+# for one server process: its GIL, its cache_resource pools and how its memory
+# grows with N sessions aren't measured. RSS growth is per user process.
+#
+#   python loadtest.py --users 1,2,4,8 --rows 5000 --iterations 3
+
+APP_DIR = Path(__file__).resolve().parent
+APP_FILE = APP_DIR / "app.py"
+PASSWORD = "loadtest"
+
+MERCHANTS = [
+    ('SWIGGY ORDER', 'Food & Groceries'), ('ZOMATO ONLINE', 'Food & Groceries'), ('UBER TRIP', 'Transport'),
+    ('OLA CABS', 'Transport'), ('AMAZON PAY', 'Shopping & Personal'), ('FLIPKART', 'Shopping & Personal'),
+    ('NETFLIX SUBSCRIPTION', 'Entertainment & Subscriptions'), ('BESCOM ELECTRICITY', 'Utilities & Bills'),
+    ('APOLLO PHARMACY', 'Health & Wellness'), ('BIGBASKET', 'Food & Groceries'),
+]
+STEPS = ['login', 'filter', 'add_transaction', 'set_goal', 'upload_parse', 'forecast']
+
+
+def generate_ledger(rows, seed=0, days=365):
+    """A random ledger in the app's layout, ending today."""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(MERCHANTS), rows)
+    is_income = rng.random(rows) < 0.05
+    today = pd.Timestamp.today().normalize()
+    df = pd.DataFrame({
+        'date': today - pd.to_timedelta(rng.integers(0, days, rows), unit='D'),
+        'description': [MERCHANTS[i][0] for i in picks],
+        'amount': rng.gamma(2.0, 400.0, rows).round(2),
+        'Income/Expense': np.where(is_income, 'Income', 'Expense'),
+        'category': [MERCHANTS[i][1] for i in picks],
+    })
+    df.loc[is_income, ['description', 'category']] = ['SALARY CREDIT', 'Income']
+    df.loc[is_income, 'amount'] *= 20
+    return df.sort_values('date', ignore_index=True)
+
+
+def setup_workdir(workdir, n_users, rows):
+    """Config, user store and one ledger per simulated user, laid out like the app's directory."""
+    shutil.copy(APP_DIR / "config.yaml", workdir / "config.yaml")
+    data_dir = workdir / "user_data"
+    data_dir.mkdir(exist_ok=True)
+    store = UserStore(data_dir / "users.db")
+    store.migrate_from_yaml(workdir / "config.yaml")
+    hashed = stauth.Hasher.hash(PASSWORD)
+    for i in range(n_users):
+        username = f"loadtest_{i}"
+        if not store.exists(username):
+            store.add(username, {'email': f"{username}@example.com", 'first_name': "Load", 'last_name': str(i),
+                                 'password': hashed, 'roles': ['user']})
+        generate_ledger(rows, seed=i).to_parquet(data_dir / f"data_{username}.parquet", index=False)
+
+
+def _by_label(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No widget labelled {label!r} (found {[w.label for w in widgets]})")
+
+
+def _check(at, step):
+    if at.exception:
+        raise RuntimeError(f"{step}: {at.exception[0].value}")
+
+
+def run_user(user_index, iterations, forecast, statement):
+    """
+    One simulated user's session, run in its own worker process. Returns the
+    (step, seconds) timings, the process's RSS growth over the session in MB
+    and the error that stopped it, if any.
+    """
+    timings = []
+    rss_start = rss_mb()
+
+    def timed(step, action):
+        start = time.perf_counter()
+        result = action()
+        timings.append((step, time.perf_counter() - start))
+        return result
+
+    try:
+        _run_scenario(user_index, iterations, forecast, statement, timed)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        # Releases the app's cached resources; the forecast pool shuts its workers down
+        st.cache_resource.clear()
+    return timings, rss_mb() - rss_start, error
+
+
+def _run_scenario(user_index, iterations, forecast, statement, timed):
+    at = AppTest.from_file(str(APP_FILE), default_timeout=300)
+    at.run()
+    _check(at, 'login page')
+    _by_label(at.text_input, "Username").input(f"loadtest_{user_index}")
+    _by_label(at.text_input, "Password").input(PASSWORD)
+    # The login run still draws the login page; the dashboard appears on the next run
+    timed('login', lambda: _by_label(at.button, "Login").click().run().run())
+    _check(at, 'login')
+    if not at.session_state["authentication_status"]:
+        raise RuntimeError(f"loadtest_{user_index} could not log in")
+
+    for i in range(iterations):
+        filter_type = ["Monthly", "Yearly", "Overall"][i % 3]
+        timed('filter', _by_label(at.selectbox, "Select Filter Type").select(filter_type).run)
+        _check(at, 'filter')
+
+        _by_label(at.text_input, "Description").input(f"SWIGGY ORDER {i}")
+        _by_label(at.number_input, "Amount").set_value(250.0 + i)
+        timed('add_transaction', _by_label(at.button, "Add Transaction").click().run)
+        _check(at, 'add_transaction')
+
+        _by_label(at.number_input, "Target Monthly Amount (₹)").set_value(5000.0 + i)
+        timed('set_goal', _by_label(at.button, "Set Goal").click().run)
+        _check(at, 'set_goal')
+
+        timed('upload_parse', lambda: parse_upload("statement.csv", statement, BUILTIN_PROFILES))
+
+        if forecast:
+            timed('forecast', _by_label(at.button, "Generate Forecast").click().run)
+            _check(at, 'forecast')
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def run_level(n_users, iterations, forecast, statement):
+    start = time.perf_counter()
+    # A fresh process per user, so no session inherits another's memory
+    with ProcessPoolExecutor(max_workers=n_users, mp_context=multiprocessing.get_context("spawn"),
+                             max_tasks_per_child=1) as pool:
+        results = list(pool.map(run_user, range(n_users), [iterations] * n_users,
+                                [forecast] * n_users, [statement] * n_users))
+    wall = time.perf_counter() - start
+    timings = [t for user_timings, _, _ in results for t in user_timings]
+    rss_growth = [growth for _, growth, _ in results]
+    errors = [error for _, _, error in results if error]
+
+    df = pd.DataFrame(timings, columns=['step', 'seconds'])
+    per_step = df.groupby('step')['seconds'].quantile([0.5, 0.95, 0.99]).unstack() * 1000
+    per_step.columns = ['p50_ms', 'p95_ms', 'p99_ms']
+    per_step['count'] = df.groupby('step').size()
+    per_step = per_step.reindex([s for s in STEPS if s in per_step.index])
+    summary = {
+        'users': n_users,
+        'reruns': len(df),
+        'wall_s': round(wall, 2),
+        'reruns_per_s': round(len(df) / wall, 2) if wall else 0.0,
+        'p50_ms': round(df['seconds'].quantile(0.5) * 1000, 1) if len(df) else np.nan,
+        'p95_ms': round(df['seconds'].quantile(0.95) * 1000, 1) if len(df) else np.nan,
+        'p99_ms': round(df['seconds'].quantile(0.99) * 1000, 1) if len(df) else np.nan,
+        'rss_growth_per_process_mb': round(float(np.mean(rss_growth)), 1),
+        'rss_growth_max_mb': round(float(np.max(rss_growth)), 1),
+        'errors': len(errors),
+    }
+    return summary, per_step.round(1), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless multi-user load test for app.py.")
+    parser.add_argument("--users", default="1,2,4,8", help="comma-separated concurrent user counts")
+    parser.add_argument("--rows", type=int, default=5_000, help="transactions in each generated ledger")
+    parser.add_argument("--iterations", type=int, default=3, help="scenario repeats per user")
+    parser.add_argument("--statement-rows", type=int, default=2_000, help="rows in the parsed upload")
+    parser.add_argument("--forecast", action="store_true", help="also run a Prophet forecast per iteration")
+    parser.add_argument("--keep", action="store_true", help="keep the generated working directory")
+    args = parser.parse_args()
+
+    levels = [int(n) for n in args.users.split(",")]
+    workdir = Path(tempfile.mkdtemp(prefix="buddy_loadtest_"))
+    setup_workdir(workdir, max(levels), args.rows)
+    statement = generate_ledger(args.statement_rows, seed=999).drop(columns=['category']).to_csv(index=False).encode()
+    # The app keeps its data under the working directory
+    os.chdir(workdir)
+
+    results = []
+    try:
+        for n_users in levels:
+            summary, per_step, errors = run_level(n_users, args.iterations, args.forecast, statement)
+            results.append(summary)
+            print(f"\n=== {n_users} concurrent user(s) ===")
+            print(per_step.to_string())
+            for error in errors[:5]:
+                print(f"  error: {error}")
+        print("\n=== Summary ===")
+        print(pd.DataFrame(results).to_string(index=False))
+        print("\nEach user ran in its own process, so this measures machine-level contention, "
+              "not N sessions sharing one server process; RSS growth is per process.")
+    finally:
+        os.chdir(APP_DIR)
+        if args.keep:
+            print(f"\nWorking directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
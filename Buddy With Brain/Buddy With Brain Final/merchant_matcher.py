@@ -0,0 +1,123 @@
+import re
+import numpy as np
+
+# --- Fuzzy merchant matching ---
+# Bank statements abbreviate and glue merchant names together ("SWGGY*BLR",
+# "ZOMATOLTD", "AMZN MKTP"), which the exact keyword match misses. Every word
+# of the rows the keywords left as 'Other' is compared against a merchant alias
+# list by character bigram overlap (Dice), all at once as one matrix product
+# over the distinct words of the batch.
+
+MERCHANT_ALIASES = {
+    'Food & Groceries': {
+        'swiggy', 'swgy', 'instamart', 'zomato', 'zmt', 'bigbasket', 'bbnow', 'blinkit', 'zepto',
+        'grofers', 'dunzo', 'dominos', 'mcdonalds', 'starbucks', 'ubereats', 'kfc', 'dmart', 'jiomart'
+    },
+    'Transport': {
+        'uber', 'olacabs', 'rapido', 'irctc', 'indigo', 'vistara', 'spicejet', 'airasia', 'akasa',
+        'redbus', 'fastag', 'iocl', 'bpcl', 'hpcl', 'indianoil', 'bharatpetroleum'
+    },
+    'Shopping & Personal': {
+        'amazon', 'amzn', 'flipkart', 'fkrt', 'myntra', 'ajio', 'nykaa', 'meesho', 'croma',
+        'decathlon', 'ikea', 'tatacliq', 'snapdeal', 'lenskart'
+    },
+    'Entertainment & Subscriptions': {
+        'netflix', 'spotify', 'hotstar', 'bookmyshow', 'youtube', 'primevideo', 'sonyliv', 'jiocinema',
+        'playstation', 'pvr', 'inox'
+    },
+    'Utilities & Bills': {
+        'airtel', 'jio', 'vodafone', 'vodaidea', 'bsnl', 'bescom', 'tatapower', 'adanielectricity',
+        'mahadiscom', 'actfibernet', 'hathway'
+    },
+    'Health & Wellness': {
+        'apollo', 'medplus', 'netmeds', 'pharmeasy', 'practo', 'cultfit', 'healthkart', 'tata1mg'
+    },
+    'Investments & Savings': {'zerodha', 'groww', 'upstox', 'kuvera', 'paytmmoney', 'smallcase'},
+    'Travel': {'makemytrip', 'goibibo', 'airbnb', 'yatra', 'oyo', 'cleartrip', 'ixigo', 'agoda'},
+    'Insurance': {'policybazaar', 'acko', 'licofindia'},
+    'Education': {'udemy', 'coursera', 'byjus', 'unacademy', 'upgrad'},
+}
+
+MATCH_THRESHOLD = 0.7
+MIN_PREFIX_ALIAS_LEN = 5   # "zomatoltd" starts with "zomato"; short aliases need a real match
+MIN_WORD_LEN = 3
+SCORE_CHUNK = 5_000   # words scored per matrix product, to bound memory
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+ALIASES = sorted((alias, cat) for cat, aliases in MERCHANT_ALIASES.items() for alias in aliases)
+ALIAS_NAMES = np.array([alias for alias, _ in ALIASES])
+ALIAS_CATEGORIES = np.array([cat for _, cat in ALIASES], dtype=object)
+
+
+def bigrams(word):
+    padded = f" {word} "
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+ALIAS_BIGRAMS = [bigrams(alias) for alias in ALIAS_NAMES]
+VOCAB = {g: i for i, g in enumerate(sorted(set().union(*ALIAS_BIGRAMS)))}
+
+
+def _indicator(grams_per_word):
+    """Words x vocabulary 0/1 matrix; bigrams outside the alias vocabulary can't overlap anyway."""
+    matrix = np.zeros((len(grams_per_word), len(VOCAB)), dtype=np.float32)
+    rows = [i for i, grams in enumerate(grams_per_word) for g in grams if g in VOCAB]
+    cols = [VOCAB[g] for grams in grams_per_word for g in grams if g in VOCAB]
+    matrix[rows, cols] = 1.0
+    return matrix
+
+
+ALIAS_MATRIX = _indicator(ALIAS_BIGRAMS)
+ALIAS_SIZES = np.array([len(g) for g in ALIAS_BIGRAMS], dtype=np.float32)
+
+
+def score_words(words):
+    """Best alias index and its score for each word."""
+    words = np.asarray(words, dtype=str)
+    if words.size > SCORE_CHUNK:
+        parts = [score_words(words[i:i + SCORE_CHUNK]) for i in range(0, words.size, SCORE_CHUNK)]
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+    if words.size == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    grams = [bigrams(w) for w in words]
+    sizes = np.array([len(g) for g in grams], dtype=np.float32)
+    overlap = _indicator(grams) @ ALIAS_MATRIX.T
+    dice = 2 * overlap / (sizes[:, None] + ALIAS_SIZES[None, :])
+
+    prefix = np.char.startswith(words[:, None], ALIAS_NAMES[None, :])
+    prefix &= np.char.str_len(ALIAS_NAMES)[None, :] >= MIN_PREFIX_ALIAS_LEN
+    scores = np.where(prefix, 1.0, dice)
+
+    best = scores.argmax(axis=1)
+    return best, scores[np.arange(len(words)), best]
+
+
+def match_merchants(descriptions, threshold=MATCH_THRESHOLD):
+    """
+    Returns (categories, scores) for a batch of descriptions. A row takes the
+    category of its best-matching word; rows with no word above `threshold`
+    get category None.
+    """
+    row_words = [[w for w in WORD_PATTERN.findall(str(d).lower()) if len(w) >= MIN_WORD_LEN]
+                 for d in descriptions]
+    categories = np.full(len(row_words), None, dtype=object)
+    scores = np.zeros(len(row_words))
+
+    # Statements repeat the same merchants, so score each distinct word once
+    flat = [w for words in row_words for w in words]
+    if not flat:
+        return categories, scores
+    unique_words, word_ids = np.unique(np.array(flat), return_inverse=True)
+    best_alias, best_score = score_words(unique_words)
+
+    # Best word per row: sort each row's words by score, then take the first
+    row_ids = np.repeat(np.arange(len(row_words)), [len(words) for words in row_words])
+    order = np.lexsort((-best_score[word_ids], row_ids))
+    first = order[np.flatnonzero(np.r_[True, row_ids[order][1:] != row_ids[order][:-1]])]
+    top_words = word_ids[first]
+    matched = best_score[top_words] >= threshold
+    rows = row_ids[first][matched]
+    categories[rows] = ALIAS_CATEGORIES[best_alias[top_words[matched]]]
+    scores[rows] = best_score[top_words[matched]]
+    return categories, scores
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+
+# --- Recurring payment / subscription detection ---
+# Transactions are grouped by a normalized merchant key, sorted once by
+# (merchant, date) and checked for a regular cadence and a stable amount.
+# The per-merchant events are kept so that new transactions only re-check
+# the merchants they touch.
+
+CADENCES = {'Weekly': 7.0, 'Monthly': 30.44, 'Quarterly': 91.31, 'Yearly': 365.25}
+MIN_OCCURRENCES = 3
+INTERVAL_TOLERANCE = 0.15  # allowed relative deviation of a gap from the cadence
+MIN_REGULAR_SHARE = 0.75   # share of gaps that must match the cadence
+AMOUNT_TOLERANCE = 0.2     # allowed relative spread of the amount (MAD / median)
+
+# Words banks add around the merchant name
+NOISE_WORDS = [
+    'upi', 'pos', 'ach', 'neft', 'imps', 'rtgs', 'nach', 'ecs', 'si', 'ref', 'txn', 'transaction',
+    'payment', 'paid', 'purchase', 'debit', 'card', 'autopay', 'mandate', 'to', 'at', 'for', 'via', 'from',
+    'the', 'of', 'www', 'com', 'in', 'pvt', 'ltd', 'rs', 'inr',
+]
+NOISE_PATTERN = r'\b(?:' + '|'.join(NOISE_WORDS) + r'|[a-z])\b'
+MERCHANT_WORDS = 3
+
+EVENT_COLUMNS = ['merchant', 'date', 'amount', 'description']
+SUMMARY_COLUMNS = ['merchant', 'description', 'cadence', 'interval_days', 'amount',
+                   'occurrences', 'last_date', 'next_date', 'is_active']
+
+
+def normalize_merchants(descriptions):
+    """Vectorized merchant keys: lowercase letters only, bank noise removed, first few words."""
+    cleaned = (
+        pd.Series(descriptions, dtype=object).astype(str).str.lower()
+        .str.replace(r'[^a-z]+', ' ', regex=True)
+        .str.replace(NOISE_PATTERN, ' ', regex=True)
+        .str.split()
+    )
+    return cleaned.str[:MERCHANT_WORDS].str.join(' ')
+
+
+def build_events(df):
+    """Merchant key, day, amount and description of every expense."""
+    expenses = df[df['Income/Expense'] == 'Expense']
+    if expenses.empty:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    events = pd.DataFrame({
+        'merchant': normalize_merchants(expenses['description']).to_numpy(),
+        'date': pd.to_datetime(expenses['date']).dt.normalize().to_numpy(),
+        'amount': pd.to_numeric(expenses['amount']).to_numpy(),
+        'description': expenses['description'].astype(str).to_numpy(),
+    })
+    return events[(events['merchant'] != '') & events['date'].notna()]
+
+
+def summarize(events, today=None):
+    """Finds merchants charged on a regular cadence with a stable amount."""
+    if events.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    today = pd.Timestamp.today().normalize() if today is None else pd.Timestamp(today)
+
+    # Several charges from one merchant on the same day count as one event
+    events = events.groupby(['merchant', 'date'], as_index=False, sort=True).agg(
+        amount=('amount', 'sum'), description=('description', 'last')
+    )
+    groups = events.groupby('merchant', sort=False)
+    gaps = groups['date'].diff().dt.days
+
+    summary = groups.agg(
+        description=('description', 'last'),
+        occurrences=('date', 'size'),
+        last_date=('date', 'max'),
+        amount=('amount', 'median'),
+    )
+    summary['median_gap'] = gaps.groupby(events['merchant'], sort=False).median()
+    summary = summary[(summary['occurrences'] >= MIN_OCCURRENCES) & summary['median_gap'].notna()].copy()
+    if summary.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+
+    # Nearest cadence for every merchant at once
+    cadence_days = np.array(list(CADENCES.values()))
+    rel_error = np.abs(summary['median_gap'].to_numpy()[:, None] / cadence_days - 1)
+    nearest = rel_error.argmin(axis=1)
+    summary['cadence'] = np.array(list(CADENCES.keys()))[nearest]
+    summary['interval_days'] = cadence_days[nearest]
+    summary = summary[rel_error[np.arange(len(summary)), nearest] <= INTERVAL_TOLERANCE].copy()
+
+    # Share of gaps that match the cadence, and spread of the amount
+    in_summary = events['merchant'].isin(summary.index)
+    merchant_col = events.loc[in_summary, 'merchant']
+    expected = merchant_col.map(summary['interval_days'])
+    gap_ok = (np.abs(gaps[in_summary] / expected - 1) <= INTERVAL_TOLERANCE).where(gaps[in_summary].notna())
+    summary['regular_share'] = gap_ok.groupby(merchant_col).mean()
+    amount_dev = np.abs(events.loc[in_summary, 'amount'] - merchant_col.map(summary['amount']))
+    summary['amount_spread'] = amount_dev.groupby(merchant_col).median() / summary['amount']
+
+    summary = summary[
+        (summary['regular_share'] >= MIN_REGULAR_SHARE) & (summary['amount_spread'] <= AMOUNT_TOLERANCE)
+    ].copy()
+    summary['next_date'] = summary['last_date'] + pd.to_timedelta(summary['interval_days'].round(), unit='D')
+    grace = pd.to_timedelta((summary['interval_days'] * 0.5).round(), unit='D')
+    summary['is_active'] = today <= summary['next_date'] + grace
+    return summary.reset_index()[SUMMARY_COLUMNS].sort_values('next_date').reset_index(drop=True)
+
+
+def update_recurring(events, summary, new_rows, today=None):
+    """Adds new transactions and re-checks only the merchants they belong to."""
+    new_events = build_events(new_rows)
+    if new_events.empty:
+        return events, summary
+    events = new_events if events.empty else pd.concat([events, new_events], ignore_index=True)
+    touched = new_events['merchant'].unique()
+    fresh = summarize(events[events['merchant'].isin(touched)], today=today)
+    kept = summary[~summary['merchant'].isin(touched)]
+    if kept.empty:
+        return events, fresh
+    if not fresh.empty:
+        kept = pd.concat([kept, fresh], ignore_index=True)
+    return events, kept.sort_values('next_date').reset_index(drop=True)
+
+
+def monthly_cost(summary):
+    """Recurring spend of the active items, scaled to a month."""
+    active = summary[summary['is_active']]
+    return float((active['amount'] * CADENCES['Monthly'] / active['interval_days']).sum())
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from learned_categorizer import categorize_batch
+from bank_profiles import read_statement
+from currency import BASE_CURRENCY, to_inr
+
+# --- Background upload processing ---
+# Parsing and categorizing an upload runs on a worker pool shared by every
+# session in the process. Jobs are registered per username, so a session that
+# reconnects after a browser refresh picks up the results of its user's jobs.
+# Saving stays in the script thread, which owns st.session_state.df; a job is
+# only discarded once its rows are saved, so a failed save is retried.
+
+MAX_WORKERS = min(4, os.cpu_count() or 1)
+CATEGORIZE_CHUNK_ROWS = 2_000
+MAX_BAD_DATE_SHARE = 0.1  # footer/summary lines are dropped, more than this fails the upload
+
+
+def parse_upload(file_name, data, profiles, model=None, report=None, currency=BASE_CURRENCY, rates=None):
+    """
+    Reads a CSV/Excel statement, converts it to rupees and categorizes it.
+    `currency` is the statement's currency where it has no currency column.
+    `report(progress, message)` is optional.
+    """
+    report = report or (lambda progress, message: None)
+    if not file_name.endswith(('xlsx', 'csv')):
+        raise ValueError(f"Unsupported file type: {file_name}")
+
+    report(0.05, "Reading file")
+    df, profile_name = read_statement(file_name, data, profiles)
+    report(0.2, f"Read {len(df)} rows as {profile_name}")
+    bad_dates = df['date'].isna()
+    if bad_dates.mean() > MAX_BAD_DATE_SHARE:
+        raise ValueError(f"{bad_dates.sum()} of {len(df)} rows have dates that don't match the {profile_name} format.")
+    df = df[~bad_dates].reset_index(drop=True)
+    df['original_amount'] = df['amount']
+    df['currency'] = df['currency'].fillna(currency) if 'currency' in df.columns else currency
+    df = to_inr(df, rates)
+
+    # Categorize in chunks so progress moves on large files
+    categories = []
+    for start in range(0, len(df), CATEGORIZE_CHUNK_ROWS):
+        chunk = df.iloc[start:start + CATEGORIZE_CHUNK_ROWS]
+        categories.extend(categorize_batch(chunk['description'], chunk['Income/Expense'], model))
+        report(0.25 + 0.7 * (start + len(chunk)) / len(df), f"Categorizing ({start + len(chunk)}/{len(df)} rows)")
+    df['category'] = categories
+    report(1.0, "Ready to save")
+    return df
+
+
+class UploadJob:
+    def __init__(self, job_id, username, file_name):
+        self.job_id = job_id
+        self.username = username
+        self.file_name = file_name
+        self.status = 'queued'   # queued -> running -> done / failed
+        self.progress = 0.0
+        self.message = "Waiting for a worker"
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+
+class UploadJobQueue:
+    def __init__(self, max_workers=MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, username, file_name, data, profiles, model=None, currency=BASE_CURRENCY, rates=None):
+        """Queues an upload and returns its job id."""
+        job = UploadJob(uuid.uuid4().hex[:12], username, file_name)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        # The worker gets its own copy; the session keeps learning corrections meanwhile
+        model = model.copy() if model is not None else None
+        self._executor.submit(self._run, job, data, profiles, model, currency, rates)
+        return job.job_id
+
+    def _run(self, job, data, profiles, model, currency, rates):
+        job.status = 'running'
+
+        def report(progress, message):
+            job.progress, job.message = progress, message
+
+        try:
+            job.result = parse_upload(job.file_name, data, profiles, model, report, currency, rates)
+            job.status = 'done'
+        except Exception as e:
+            job.error = str(e)
+            job.status = 'failed'
+        job.finished_at = time.time()
+
+    def jobs_for(self, username):
+        with self._lock:
+            return [job for job in self._jobs.values() if job.username == username]
+
+    def finished_jobs(self, username):
+        """The user's finished jobs, oldest first; they stay registered until discarded."""
+        with self._lock:
+            finished = [job for job in self._jobs.values() if job.username == username and job.finished]
+        return sorted(finished, key=lambda job: job.submitted_at)
+
+    def discard(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
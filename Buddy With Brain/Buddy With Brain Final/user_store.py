@@ -0,0 +1,220 @@
+import json
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+import yaml
+from yaml.loader import SafeLoader
+
+# --- Indexed user registry ---
+# Replaces the credentials section of config.yaml with a SQLite table keyed by
+# username (and unique on email), so logins are index lookups, registration is
+# one transaction and the admin list can be paged. UsernameIndex looks like the
+# credentials['usernames'] dict that streamlit-authenticator expects.
+
+USER_FIELDS = ['email', 'first_name', 'last_name', 'password', 'password_hint',
+               'roles', 'failed_login_attempts', 'logged_in']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    first_name TEXT,
+    last_name TEXT,
+    password TEXT NOT NULL,
+    password_hint TEXT,
+    roles TEXT NOT NULL DEFAULT '["user"]',
+    failed_login_attempts INTEGER NOT NULL DEFAULT 0,
+    logged_in INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+PREFIX_END = "\U0010ffff"   # sorts after any text that starts with the prefix
+
+
+def _to_row(record):
+    row = {f: record.get(f) for f in USER_FIELDS}
+    row['roles'] = json.dumps(row['roles'] or ['user'])
+    row['failed_login_attempts'] = int(row['failed_login_attempts'] or 0)
+    row['logged_in'] = int(bool(row['logged_in']))
+    return row
+
+
+def _from_row(row):
+    record = dict(row)
+    record.pop('username', None)
+    record.pop('created_at', None)
+    record['roles'] = json.loads(record['roles']) if record['roles'] else []
+    record['logged_in'] = bool(record['logged_in'])
+    return record
+
+
+class UserStore:
+    def __init__(self, db_file):
+        self.db_file = str(db_file)
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self):
+        # One connection per thread; Streamlit runs each session in its own thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, username):
+        row = self._conn().execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        return _from_row(row) if row else None
+
+    def exists(self, username):
+        return self._conn().execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+    def email_exists(self, email):
+        return self._conn().execute("SELECT 1 FROM users WHERE email = ?", (email,)).fetchone() is not None
+
+    def add(self, username, record):
+        """Inserts a user in one transaction; raises ValueError if the username or email is taken."""
+        row = _to_row(record)
+        try:
+            with self._conn() as conn:
+                conn.execute(
+                    f"INSERT INTO users (username, {', '.join(USER_FIELDS)}) "
+                    f"VALUES (?, {', '.join('?' * len(USER_FIELDS))})",
+                    [username] + [row[f] for f in USER_FIELDS]
+                )
+        except sqlite3.IntegrityError:
+            raise ValueError("Username or email is already registered")
+
+    def update(self, username, **fields):
+        fields = {k: v for k, v in fields.items() if k in USER_FIELDS}
+        if not fields:
+            return
+        row = _to_row({**(self.get(username) or {}), **fields})
+        with self._conn() as conn:
+            conn.execute(
+                f"UPDATE users SET {', '.join(f'{k} = ?' for k in fields)} WHERE username = ?",
+                [row[k] for k in fields] + [username]
+            )
+
+    def delete(self, username):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM users WHERE username = ?", (username,))
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def usernames(self):
+        for row in self._conn().execute("SELECT username FROM users ORDER BY username"):
+            yield row[0]
+
+    def iter_users(self):
+        for row in self._conn().execute("SELECT * FROM users ORDER BY username"):
+            yield row['username'], _from_row(row)
+
+    def page(self, offset, limit, search=None):
+        """One page of the admin user directory, ordered by username; `search` is a prefix."""
+        query, params = "SELECT * FROM users", []
+        if search:
+            # Prefix ranges use the username and email indexes (LIKE would scan the
+            # table) and take '_' and '%' literally. Usernames are stored lowercase.
+            query += " WHERE (username >= ? AND username < ?) OR (email >= ? AND email < ?)"
+            params += [search.lower(), search.lower() + PREFIX_END, search, search + PREFIX_END]
+        query += " ORDER BY username LIMIT ? OFFSET ?"
+        return [(row['username'], _from_row(row)) for row in self._conn().execute(query, params + [limit, offset])]
+
+    def migrate_from_yaml(self, config_file):
+        """Copies the users in config.yaml into the store once. Returns how many were added."""
+        if self._conn().execute("SELECT 1 FROM meta WHERE key = 'yaml_migrated'").fetchone():
+            return 0
+        added = 0
+        if config_file.exists():
+            with open(config_file) as f:
+                config = yaml.load(f, Loader=SafeLoader) or {}
+            users = (config.get('credentials') or {}).get('usernames') or {}
+            with self._conn() as conn:
+                for username, details in users.items():
+                    row = _to_row(details)
+                    cur = conn.execute(
+                        f"INSERT OR IGNORE INTO users (username, {', '.join(USER_FIELDS)}) "
+                        f"VALUES (?, {', '.join('?' * len(USER_FIELDS))})",
+                        [username.lower()] + [row[f] for f in USER_FIELDS]
+                    )
+                    added += cur.rowcount
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('yaml_migrated', ?)", (str(config_file),))
+        return added
+
+
+class UserRecord(dict):
+    """A user's details; assigning a field writes it through to the store."""
+
+    def __init__(self, store, username, record):
+        super().__init__(record)
+        self._store = store
+        self._username = username
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._store.update(self._username, **{key: value})
+
+
+class UsernameIndex(MutableMapping):
+    """Dict-like view of the store for credentials['usernames']."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, username):
+        record = self._store.get(username)
+        if record is None:
+            raise KeyError(username)
+        return UserRecord(self._store, username, record)
+
+    def __setitem__(self, username, record):
+        self._store.add(username, record)
+
+    def __delitem__(self, username):
+        if not self._store.exists(username):
+            raise KeyError(username)
+        self._store.delete(username)
+
+    def __contains__(self, username):
+        return isinstance(username, str) and self._store.exists(username)
+
+    def __iter__(self):
+        return self._store.usernames()
+
+    def __len__(self):
+        return self._store.count()
+
+    # One query instead of one lookup per user
+    def items(self):
+        return ((u, UserRecord(self._store, u, r)) for u, r in self._store.iter_users())
+
+    def values(self):
+        return (record for _, record in self.items())
+
+
+def attach_user_store(authenticator, store):
+    """
+    Points an stauth.Authenticate at the store. The authenticator is built with
+    an empty user dict (it copies whatever it is given), then its credentials
+    are swapped for the index.
+    """
+    index = UsernameIndex(store)
+    model = getattr(getattr(authenticator, 'authentication_controller', None), 'authentication_model', None)
+    holders = [h for h in (model, authenticator) if h is not None and isinstance(getattr(h, 'credentials', None), dict)]
+    if not holders:
+        raise RuntimeError("This streamlit-authenticator version does not expose its credentials")
+    for holder in holders:
+        holder.credentials['usernames'] = index
+    # stauth checks for a taken email by scanning every user's fields; it only
+    # ever asks about emails, so answer from the unique email index instead
+    if model is not None and hasattr(model, '_credentials_contains_value'):
+        model._credentials_contains_value = store.email_exists
+    return index
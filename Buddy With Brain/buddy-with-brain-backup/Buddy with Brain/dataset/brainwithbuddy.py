@@ -1,5 +1,8 @@
 import streamlit as st
 import pandas as pd
+import pyarrow.parquet as pq
+from pathlib import Path
+import etl
 
 st.set_page_config(
     page_title="Expense Visualizer",
@@ -11,15 +14,24 @@ st.set_page_config(
 st.title("📊 My Personal Expense Visualizer")
 st.write("This dashboard shows your historical spending from the dataset.")
 
+@st.cache_data
+def load_processed(path, mtime):
+    """Reads the ETL output once per file version; it is already typed and date-indexed."""
+    return pq.read_table(path, memory_map=True).to_pandas()
+
 #Load the Processed Data 
+processed_file = Path(etl.DEFAULT_OUTPUT)
 try:
-    data = pd.read_csv('processed_dataset.csv')
-    data['Date'] = pd.to_datetime(data['Date'])
-    data.set_index('Date', inplace=True)
+    # Unchanged inputs are recognised by their hash, so this is cheap on every run
+    with st.spinner("Preparing the dataset..."):
+        etl.run(log=lambda message: None)
 except FileNotFoundError:
-    st.error("Error: 'processed_dataset.csv' not found.")
-    st.info("Please make sure the processed data file is in the same folder as this app.py file.")
-    st.stop() 
+    if not processed_file.exists():
+        st.error(f"Error: '{etl.DEFAULT_INPUTS[0]}' not found.")
+        st.info("Run `python etl.py <dataset files>` in this folder to build the processed data.")
+        st.stop()
+
+data = load_processed(str(processed_file), processed_file.stat().st_mtime)
 
 #Sidebar for Filtering
 st.sidebar.header("Filter by Date")
@@ -45,7 +57,7 @@ end_date = st.sidebar.slider(
 
 # Use .loc for robust date range slicing. This correctly handles
 # cases where the start or end dates are not in the index.
-filtered_data = data.loc[start_date:end_date]
+filtered_data = data.loc[pd.Timestamp(start_date):pd.Timestamp(end_date)]
 
 
 # Main Page Display
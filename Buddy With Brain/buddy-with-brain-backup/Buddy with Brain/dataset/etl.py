@@ -0,0 +1,111 @@
+import argparse
+import hashlib
+import json
+from pathlib import Path
+import pandas as pd
+
+# --- Expense dataset ETL ---
+# Does what the notebook's preprocessing cells did (read the Excel file,
+# coerce Amount, drop rows without an amount) as a reusable step. Each input
+# is content-hashed and its cleaned copy cached, so unchanged inputs are
+# skipped. The result is a typed, date-sorted Parquet file that the
+# visualizer can load directly.
+
+DEFAULT_INPUTS = ['My_Dataset.xlsx']
+DEFAULT_OUTPUT = 'processed_dataset.parquet'
+CACHE_DIR = Path('.etl_cache')
+MANIFEST_FILE = CACHE_DIR / 'manifest.json'
+
+CATEGORICAL_COLUMNS = ['Expenses', 'Category', 'Municipality', 'Province', 'Region']
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def read_input(path):
+    if path.suffix == '.xlsx':
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+def clean(df):
+    """The notebook's preprocessing, with explicit column types."""
+    df = df.copy()
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce')
+    df = df.dropna(subset=['Date', 'Amount'])
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    if 'ID' in df.columns:
+        df['ID'] = df['ID'].astype('string')
+    return df
+
+
+def load_manifest():
+    if MANIFEST_FILE.exists():
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    return {'inputs': {}, 'output': None}
+
+
+def run(inputs=None, output=DEFAULT_OUTPUT, force=False, log=print):
+    """
+    Cleans each input that changed since the last run and rebuilds the output
+    if anything changed. Returns True if the output was (re)written.
+    """
+    inputs = [Path(p) for p in (inputs or DEFAULT_INPUTS)]
+    output = Path(output)
+    CACHE_DIR.mkdir(exist_ok=True)
+    manifest = load_manifest()
+
+    hashes = {}
+    changed = False
+    for path in inputs:
+        digest = file_hash(path)
+        hashes[str(path)] = digest
+        cached = CACHE_DIR / f"{digest}.parquet"
+        if not force and cached.exists():
+            log(f"{path}: unchanged, skipped")
+            continue
+        df = clean(read_input(path))
+        df.to_parquet(cached, index=False)
+        log(f"{path}: cleaned {len(df)} rows")
+        changed = True
+
+    state = {'inputs': hashes, 'output': str(output)}
+    if not changed and output.exists() and manifest == state:
+        log(f"{output}: up to date")
+        return False
+
+    parts = [pd.read_parquet(CACHE_DIR / f"{hashes[str(p)]}.parquet") for p in inputs]
+    combined = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    for col in CATEGORICAL_COLUMNS:
+        if col in combined.columns:
+            combined[col] = combined[col].astype('category')
+    # Sorted by date so readers can slice (and parquet statistics can prune) by range
+    combined = combined.sort_values('Date', kind='mergesort').set_index('Date')
+    combined.to_parquet(output, row_group_size=100_000)
+    log(f"{output}: wrote {len(combined)} rows")
+
+    with open(MANIFEST_FILE, 'w') as f:
+        json.dump(state, f, indent=4)
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean the expense dataset into a Parquet file for the visualizer.")
+    parser.add_argument("inputs", nargs="*", help=f"Excel/CSV files (default: {' '.join(DEFAULT_INPUTS)})")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--force", action="store_true", help="reprocess inputs even if unchanged")
+    args = parser.parse_args()
+    run(args.inputs, args.output, args.force)
+
+
+if __name__ == "__main__":
+    main()